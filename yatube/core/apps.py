@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from yatube import db
+        db.install()
+        if settings.TEMPLATE_PROFILING:
+            from . import profiling
+            profiling.install()
@@ -0,0 +1,145 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+В Django 2.2 нет ни ASGI, ни асинхронных представлений, поэтому
+`ASGIHandler` принимает соединения в цикле событий, а сам запрос отдаёт
+WSGI-обработчику в пул из `workers` потоков. Поток занят только пока
+Django строит ответ: тело запроса дочитывается в цикле событий (большое
+— во временный файл, как `FILE_UPLOAD_MAX_MEMORY_SIZE`), а готовый ответ
+отдаётся медленному клиенту уже без потока.
+
+Ответ собирается целиком в том же потоке, что и строился: при закрытии
+ответа Django возвращает соединения с базой этого потока в пул.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+def environ(scope, body):
+    """WSGI-окружение для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = environ[name] + separator + value
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, workers, startup=None):
+        self.wsgi_application = wsgi_application
+        self.startup = startup
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        try:
+            status, headers, content = await (
+                asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.respond, environ(scope, body)
+                )
+            )
+        finally:
+            body.close()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент отключился."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def respond(self, environ):
+        """Выполнить WSGI-приложение; статус, заголовки и тело ответа."""
+        response = {}
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+            return chunks.append
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], b''.join(chunks)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.startup:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.executor, self.startup
+                    )
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.close
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        self.executor.shutdown(wait=True)
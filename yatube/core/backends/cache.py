@@ -0,0 +1,49 @@
+from time import perf_counter
+
+from django.core.cache.backends import locmem
+
+from .. import metrics
+
+MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Считает попадания, промахи и время чтения из кэша.
+
+    Внутренние кэши (например, общий уровень двухуровневого кэша)
+    выключают подсчёт через `instrumented`, чтобы одно обращение не
+    учитывалось дважды.
+    """
+
+    instrumented = True
+
+    def get(self, key, default=None, version=None):
+        if not self.instrumented:
+            return super().get(key, default, version)
+        started = perf_counter()
+        value = super().get(key, MISSING, version)
+        metrics.add('cache_seconds', perf_counter() - started)
+        if value is MISSING:
+            metrics.add('cache_misses', 1)
+            return default
+        metrics.add('cache_hits', 1)
+        return value
+
+    def get_many(self, keys, version=None):
+        if not self.instrumented:
+            return super().get_many(keys, version)
+        keys = list(keys)
+        started = perf_counter()
+        self.instrumented = False
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            del self.instrumented
+        metrics.add('cache_seconds', perf_counter() - started)
+        metrics.add('cache_hits', len(found))
+        metrics.add('cache_misses', len(keys) - len(found))
+        return found
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
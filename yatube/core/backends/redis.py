@@ -0,0 +1,239 @@
+"""Общий кэш на сервере, говорящем по протоколу Redis (RESP).
+
+Клиент умещается в этот модуль, поэтому отдельная библиотека не нужна.
+Экземпляры бэкенда создаются по одному на поток (так устроен
+`django.core.cache.caches`), и у каждого своё соединение.
+"""
+import pickle
+import socket
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .cache import CacheMetricsMixin
+
+DEFAULT_PORT = 6379
+
+
+class RespError(Exception):
+    """Ответ сервера с ошибкой."""
+
+
+def encode(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Соединение с кэшем закрыто')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        raise RespError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        return stream.read(length + 2)[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f'Непонятный ответ: {line!r}')
+
+
+class RespConnection:
+    """Соединение с сервером; переподключается после сбоя."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=None):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.sock = self.stream = None
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address, self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if self.password:
+            self.send([('AUTH', self.password)])
+        if self.db:
+            self.send([('SELECT', self.db)])
+
+    def close(self):
+        if self.sock is not None:
+            self.stream.close()
+            self.sock.close()
+        self.sock = self.stream = None
+
+    def send(self, commands):
+        self.sock.sendall(b''.join(encode(*command) for command in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(read_reply(self.stream))
+            except RespError as exc:
+                error = error or exc
+                replies.append(exc)
+        if error:
+            raise error
+        return replies
+
+    def pipeline(self, commands):
+        """Отправить команды одной пачкой и вернуть ответы."""
+        if not commands:
+            return []
+        try:
+            if self.sock is None:
+                self.connect()
+            return self.send(commands)
+        except OSError:
+            # Соединение могло оборваться между запросами: одна попытка
+            # с новым. Если сервер недоступен, ошибка уходит наверх.
+            self.close()
+            try:
+                self.connect()
+                return self.send(commands)
+            except OSError:
+                self.close()
+                raise
+
+    def command(self, *args):
+        return self.pipeline([args])[0]
+
+
+class RespCache(BaseCache):
+    """Кэш Django поверх сервера Redis.
+
+    `LOCATION` — адрес вида `redis://[:пароль@]хост[:порт][/база]`.
+    Целые числа хранятся строкой, чтобы `incr` был атомарным `INCRBY`,
+    остальные значения сериализуются `pickle`.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        url = urlparse(location)
+        options = params.get('OPTIONS', {})
+        self.connection = RespConnection(
+            url.hostname or 'localhost',
+            url.port or DEFAULT_PORT,
+            db=int(url.path.strip('/') or 0),
+            password=url.password,
+            timeout=options.get('SOCKET_TIMEOUT'),
+        )
+
+    def key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def dumps(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def expiry(self, timeout=DEFAULT_TIMEOUT):
+        """Аргументы `SET` для срока жизни; 0 — уже истёкшая запись."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 0))
+
+    def set_command(self, key, value, timeout, *flags):
+        expiry = self.expiry(timeout)
+        if expiry and expiry[1] == 0:
+            return ('DEL', key)
+        return ('SET', key, self.dumps(value), *expiry, *flags)
+
+    def get(self, key, default=None, version=None):
+        data = self.connection.command('GET', self.key(key, version))
+        return default if data is None else self.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.command(
+            *self.set_command(self.key(key, version), value, timeout)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        command = self.set_command(
+            self.key(key, version), value, timeout, 'NX'
+        )
+        if command[0] == 'DEL':
+            return False
+        return self.connection.command(*command) is not None
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        expiry = self.expiry(timeout)
+        if not expiry:
+            self.connection.command('PERSIST', key)
+            return bool(self.connection.command('EXISTS', key))
+        return bool(self.connection.command('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        self.connection.command('DEL', self.key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = {self.key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        values = self.connection.command('MGET', *keys)
+        return {
+            keys[key]: self.loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.pipeline([
+            self.set_command(self.key(key, version), value, timeout)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.key(key, version) for key in keys]
+        if keys:
+            self.connection.command('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.connection.command('EXISTS', self.key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.key(key, version)
+        value = self.connection.command('GET', key)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        if not value.lstrip(b'-').isdigit():
+            raise ValueError(f"Key '{key}' is not an integer")
+        return self.connection.command('INCRBY', key, delta)
+
+    def clear(self):
+        self.connection.command('FLUSHDB')
+
+    def close(self, **kwargs):
+        """Соединение живёт между запросами."""
+
+
+class RedisCache(CacheMetricsMixin, RespCache):
+    pass
@@ -0,0 +1,29 @@
+from django.db.backends.sqlite3 import base
+
+from ... import pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, соединения которого берутся из `core.pool`.
+
+    Закрытие возвращает соединение в пул. База в памяти (тесты) живёт,
+    пока открыто её соединение, поэтому с ней пул не используется.
+    """
+
+    pooled = True
+    reused_connection = False
+
+    def get_new_connection(self, conn_params):
+        if self.is_in_memory_db():
+            return super().get_new_connection(conn_params)
+        connect = super().get_new_connection
+        connection, self.reused_connection = pool.get(self.alias).acquire(
+            lambda: connect(conn_params)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.is_in_memory_db():
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.get(self.alias).release(self.connection)
@@ -0,0 +1,57 @@
+import os
+
+from django.template import TemplateDoesNotExist, engines
+from django.template.backends import django
+from django.template.loaders.cached import Loader as CachedLoader
+
+from .. import metrics
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        with metrics.timer('template_seconds'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """Шаблоны Django с замером времени отрисовки."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
+
+    def template_names(self):
+        for directory in self.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    yield os.path.relpath(os.path.join(root, name), directory)
+
+    def warm_up(self):
+        """Скомпилировать все шаблоны из DIRS; вернуть их число.
+
+        Имеет смысл только с кэширующим загрузчиком, без него ничего
+        не делает.
+        """
+        if not any(
+            isinstance(loader, CachedLoader)
+            for loader in self.engine.template_loaders
+        ):
+            return 0
+        count = 0
+        for name in self.template_names():
+            self.engine.get_template(name)
+            count += 1
+        return count
+
+
+def warm_up():
+    """Прогреть кэш шаблонов всех движков при старте процесса."""
+    return sum(
+        engine.warm_up() for engine in engines.all()
+        if isinstance(engine, DjangoTemplates)
+    )
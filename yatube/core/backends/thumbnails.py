@@ -0,0 +1,11 @@
+from sorl.thumbnail import base
+
+from .. import metrics
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """Бэкенд sorl-thumbnail с замером времени получения миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with metrics.timer('thumbnail_seconds'):
+            return super().get_thumbnail(file_, geometry_string, **options)
@@ -0,0 +1,280 @@
+"""Двухуровневый кэш: локальный LRU процесса поверх общего кэша.
+
+Чтение сначала идёт в LRU процесса (L1), затем в общий кэш (L2), и
+найденное копируется в L1 на `LOCAL_TIMEOUT` секунд. Запись и удаление
+идут в оба уровня, поэтому другие процессы увидят изменение не позже
+чем через `LOCAL_TIMEOUT`.
+
+Чтобы истечение популярного ключа не обрушило на базу одновременные
+пересчёты, используются два приёма:
+
+* вероятностный досрочный пересчёт (XFetch): вместе со значением
+  хранится, сколько его считали, и незадолго до истечения отдельные
+  читатели получают промах и пересчитывают значение, пока остальные
+  ещё читают старое;
+* `get_or_set` пересчитывает значение в одном потоке на весь кластер
+  (блокировка через `add` в L2), остальные ждут готового значения.
+
+Если L2 недоступен, обращение к нему считается промахом, а кэш на
+`DOWN_INTERVAL` секунд работает только с L1, чтобы запросы не ждали
+таймаута соединения каждый раз. Удаления за это время до L2 не
+доходят, поэтому значения в нём должны жить недолго или быть
+версионированы.
+"""
+import logging
+import math
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .cache import MISSING, CacheMetricsMixin
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+# Сколько промахов без последующей записи помнить в одном потоке.
+MAX_PENDING_MISSES = 1000
+
+_lrus = {}
+_lrus_lock = threading.Lock()
+# До какого момента `time.monotonic()` L2 кэша с этим именем считается
+# недоступным.
+_down_until = {}
+
+
+class LRU:
+    """Потокобезопасный LRU со сроком жизни записей."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (time.monotonic() + timeout, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def raw_key(key, key_prefix, version):
+    return key
+
+
+class TieredCache(CacheMetricsMixin, BaseCache):
+    """L1 в памяти процесса, L2 — кэш из `OPTIONS['SHARED']`.
+
+    `OPTIONS['SHARED']` описывает общий кэш так же, как запись
+    `CACHES`. В L2 лежат конверты `(значение, истекает, время
+    пересчёта)`, поэтому читать его нужно только через этот бэкенд.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        shared = options['SHARED']
+        self.shared = import_string(shared['BACKEND'])(
+            shared.get('LOCATION', ''), shared
+        )
+        self.shared.instrumented = False
+        self.shared.key_func = raw_key
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.beta = options.get('BETA', 1.0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.down_interval = options.get('DOWN_INTERVAL', 5)
+        self.name = name
+        with _lrus_lock:
+            self.local = _lrus.setdefault(name, LRU(self._max_entries))
+        self.misses = {}
+
+    def key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def call_shared(self, method, *args, default=None):
+        """Вызвать метод L2; `default`, если он недоступен."""
+        if _down_until.get(self.name, 0) > time.monotonic():
+            return default
+        try:
+            return getattr(self.shared, method)(*args)
+        except OSError:
+            _down_until[self.name] = time.monotonic() + self.down_interval
+            logger.warning(
+                'Общий кэш недоступен, %s с используется только локальный',
+                self.down_interval, exc_info=True,
+            )
+            return default
+
+    def timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def expiring(self, envelope):
+        """Пора ли этому читателю пересчитать значение (XFetch)."""
+        _, expires, delta = envelope
+        if expires is None or not delta:
+            return False
+        gap = -delta * self.beta * math.log(1 - random.random())
+        return time.time() + gap >= expires
+
+    def remember(self, key, envelope):
+        _, expires, _ = envelope
+        timeout = self.local_timeout
+        if expires is not None:
+            timeout = min(timeout, expires - time.time())
+        if timeout > 0:
+            self.local.set(key, envelope, timeout)
+
+    def fetch(self, keys):
+        """Конверты ключей из L1, а недостающих — из L2."""
+        found = {}
+        for key in keys:
+            envelope = self.local.get(key)
+            if envelope is not None:
+                found[key] = envelope
+        missing = [key for key in keys if key not in found]
+        if missing:
+            for key, envelope in self.call_shared(
+                'get_many', missing, default={}
+            ).items():
+                self.remember(key, envelope)
+                found[key] = envelope
+        return found
+
+    def unpack(self, key, envelope):
+        if envelope is None or self.expiring(envelope):
+            if len(self.misses) >= MAX_PENDING_MISSES:
+                self.misses.clear()
+            self.misses[key] = time.monotonic()
+            return MISSING
+        return envelope[0]
+
+    def pack(self, key, value, timeout):
+        started = self.misses.pop(key, None)
+        delta = time.monotonic() - started if started is not None else 0
+        expires = None if timeout is None else time.time() + timeout
+        return (value, expires, delta)
+
+    def get(self, key, default=None, version=None):
+        key = self.key(key, version)
+        value = self.unpack(key, self.fetch([key]).get(key))
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = {self.key(key, version): key for key in keys}
+        found = self.fetch(list(keys))
+        values = {
+            keys[key]: self.unpack(key, found.get(key)) for key in keys
+        }
+        return {
+            key: value for key, value in values.items()
+            if value is not MISSING
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.timeout(timeout)
+        envelopes = {
+            self.key(key, version): value for key, value in data.items()
+        }
+        envelopes = {
+            key: self.pack(key, value, timeout)
+            for key, value in envelopes.items()
+        }
+        self.call_shared('set_many', envelopes, timeout)
+        for key, envelope in envelopes.items():
+            if timeout is not None and timeout <= 0:
+                self.local.delete(key)
+            else:
+                self.remember(key, envelope)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.timeout(timeout)
+        key = self.key(key, version)
+        envelope = self.pack(key, value, timeout)
+        added = self.call_shared('add', key, envelope, timeout)
+        if added is None:
+            # Без L2 ключ уникален только в пределах процесса.
+            added = self.local.get(key) is None
+        if added:
+            self.remember(key, envelope)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, MISSING, version)
+        if value is MISSING:
+            return False
+        self.set(key, value, timeout, version)
+        return True
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.key(key, version) for key in keys]
+        for key in keys:
+            self.local.delete(key)
+        self.call_shared('delete_many', keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Значение ключа, пересчитанное одним потоком при промахе."""
+        value = self.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+        lock = f'{self.key(key, version)}:lock'
+        # None — L2 недоступен, значение считается без блокировки.
+        locked = self.call_shared('add', lock, 1, self.lock_timeout)
+        if locked is False:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                envelope = self.call_shared('get', self.key(key, version))
+                if envelope is not None:
+                    return envelope[0]
+        try:
+            value = default() if callable(default) else default
+            self.set(key, value, timeout, version)
+        finally:
+            if locked:
+                self.call_shared('delete', lock)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        self.call_shared('clear')
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,259 @@
+"""Замеры стоимости запросов.
+
+`PerformanceMiddleware` открывает на время запроса `Measurement`, а
+инструментированные бэкенды (`core.backends`) и обёртка курсора БД
+добавляют в него время и счётчики. По завершении запроса замер
+попадает в гистограммы по имени представления, которые отдаются в
+текстовом формате Prometheus.
+"""
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+
+from . import pool, profiling
+
+_local = threading.local()
+_lock = threading.Lock()
+
+PREFIX = 'yatube'
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Measurement:
+    """Время и счётчики одного запроса."""
+
+    __slots__ = (
+        'db_queries', 'db_seconds', 'template_seconds',
+        'cache_hits', 'cache_misses', 'cache_seconds',
+        'thumbnail_seconds',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+
+class Histogram:
+    """Накопительная гистограмма в духе Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield format_number(bound), total
+        yield '+Inf', self.count
+
+
+HISTOGRAMS = {
+    'request_seconds': 'Время обработки запроса',
+    'db_seconds': 'Время запросов к БД',
+    'db_queries': 'Число запросов к БД',
+    'template_seconds': 'Время отрисовки шаблонов',
+    'cache_seconds': 'Время обращений к кэшу',
+    'thumbnail_seconds': 'Время получения миниатюр',
+}
+COUNTERS = {
+    'cache_hits': 'Попадания в кэш',
+    'cache_misses': 'Промахи кэша',
+}
+
+_histograms = {}
+_counters = {}
+
+
+def current():
+    """Замер текущего запроса или None вне запроса."""
+    return getattr(_local, 'measurement', None)
+
+
+def start():
+    _local.measurement = Measurement()
+    return _local.measurement
+
+
+def stop():
+    _local.measurement = None
+
+
+def add(name, value):
+    measurement = current()
+    if measurement is not None:
+        setattr(measurement, name, getattr(measurement, name) + value)
+
+
+def merge(measurement):
+    """Добавить к замеру запроса замер его части из другого потока."""
+    for name in Measurement.__slots__:
+        add(name, getattr(measurement, name))
+
+
+@contextmanager
+def timer(name):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        add(name, perf_counter() - started)
+
+
+def time_query(execute, sql, params, many, context):
+    """Обёртка `connection.execute_wrapper`, считающая запросы к БД."""
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        add('db_seconds', perf_counter() - started)
+        add('db_queries', 1)
+
+
+def histogram(name, view):
+    key = (name, view)
+    if key not in _histograms:
+        _histograms[key] = Histogram(
+            QUERY_BUCKETS if name == 'db_queries'
+            else settings.METRICS_BUCKETS
+        )
+    return _histograms[key]
+
+
+def record(view, seconds, measurement):
+    values = {
+        name: getattr(measurement, name)
+        for name in HISTOGRAMS if name != 'request_seconds'
+    }
+    values['request_seconds'] = seconds
+    with _lock:
+        for name, value in values.items():
+            histogram(name, view).observe(value)
+        for name in COUNTERS:
+            _counters[name, view] = (
+                _counters.get((name, view), 0) + getattr(measurement, name)
+            )
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def label(view):
+    return f'view="{escape(view)}"'
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        histograms = {
+            key: (list(value.samples()), value.sum, value.count)
+            for key, value in _histograms.items()
+        }
+        counters = dict(_counters)
+    lines = []
+    for name, help_text in HISTOGRAMS.items():
+        metric = f'{PREFIX}_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (key, view), (samples, total, count) in sorted(
+            histograms.items()
+        ):
+            if key != name:
+                continue
+            for bound, cumulative in samples:
+                lines.append(
+                    f'{metric}_bucket{{{label(view)},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(
+                f'{metric}_sum{{{label(view)}}} {format_number(total)}'
+            )
+            lines.append(f'{metric}_count{{{label(view)}}} {count}')
+    for name, help_text in COUNTERS.items():
+        metric = f'{PREFIX}_{name}_total'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for (key, view), value in sorted(counters.items()):
+            if key == name:
+                lines.append(f'{metric}{{{label(view)}}} {value}')
+    lines += pool_lines()
+    lines += profile_lines()
+    return '\n'.join(lines) + '\n'
+
+
+POOL_COUNTERS = {
+    'created': 'Открытые пулом соединения',
+    'acquired': 'Выдачи соединений из пула',
+    'waits': 'Выдачи, которым пришлось ждать свободного соединения',
+    'wait_seconds': 'Время ожидания свободного соединения',
+    'recycled': 'Соединения, закрытые по возрасту',
+    'health_check_failures': 'Соединения, не прошедшие проверку',
+}
+
+
+def pool_lines():
+    """Состояние пулов соединений `core.pool`."""
+    stats = pool.stats()
+    if not stats:
+        return []
+    metric = f'{PREFIX}_db_pool_connections'
+    lines = [
+        f'# HELP {metric} Соединения пула: занятые и свободные',
+        f'# TYPE {metric} gauge',
+    ]
+    for alias, values in sorted(stats.items()):
+        for state in ('in_use', 'idle'):
+            lines.append(
+                f'{metric}{{alias="{escape(alias)}",state="{state}"}} '
+                f'{values[state]}'
+            )
+    for name, help_text in POOL_COUNTERS.items():
+        metric = f'{PREFIX}_db_pool_{name}_total'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        lines += [
+            f'{metric}{{alias="{escape(alias)}"}} '
+            f'{format_number(values[name])}'
+            for alias, values in sorted(stats.items())
+        ]
+    return lines
+
+
+def profile_lines():
+    """Замеры `core.profiling`, если профилирование шаблонов включено."""
+    report = profiling.report()
+    if not report:
+        return []
+    families = (
+        ('calls', 'Отрисовки фрагмента'),
+        ('seconds', 'Полное время отрисовки фрагмента'),
+        ('self_seconds', 'Время фрагмента без вложенных'),
+    )
+    lines = []
+    for field, help_text in families:
+        metric = f'{PREFIX}_template_profile_{field}_total'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        lines += [
+            f'{metric}{{kind="{row["kind"]}",name="{escape(row["name"])}"}} '
+            f'{format_number(row[field])}'
+            for row in report
+        ]
+    return lines
@@ -0,0 +1,96 @@
+from contextlib import ExitStack
+from time import perf_counter, time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PerformanceMiddleware:
+    """Замеряет стоимость запроса и пишет её в `Server-Timing`.
+
+    Время, запросы к БД, отрисовка шаблонов, кэш и миниатюры
+    складываются в гистограммы по имени представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measurement = metrics.start()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        seconds = perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.record(view, seconds, measurement)
+        response['Server-Timing'] = server_timing(seconds, measurement)
+        return response
+
+
+def server_timing(seconds, measurement):
+    def milliseconds(value):
+        return f'{value * 1000:.1f}'
+
+    return ', '.join((
+        f'total;dur={milliseconds(seconds)}',
+        f'db;dur={milliseconds(measurement.db_seconds)};'
+        f'desc="{measurement.db_queries} queries"',
+        f'tpl;dur={milliseconds(measurement.template_seconds)}',
+        f'cache;dur={milliseconds(measurement.cache_seconds)};'
+        f'desc="{measurement.cache_hits} hits, '
+        f'{measurement.cache_misses} misses"',
+        f'thumb;dur={milliseconds(measurement.thumbnail_seconds)}',
+    ))
+
+
+class ReplicaMiddleware:
+    """Включает чтение из реплик для представлений-лент.
+
+    После записи ставит cookie с её временем: пока реплики могут не
+    знать о записи, этот пользователь читает из основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.release()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.release()
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, str(time()),
+                max_age=settings.REPLICA_LAG_TOLERANCE,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+            and not self.sticky(request)
+        ):
+            routers.use_replica()
+
+    def sticky(self, request):
+        try:
+            written = float(request.COOKIES[settings.REPLICA_STICKY_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return routers.recently_written(written)
@@ -0,0 +1,84 @@
+"""Одновременное выполнение независимых частей запроса.
+
+В Django 2.2 нет асинхронных представлений, поэтому независимые чтения
+одного запроса — например, страницу постов автора и проверку подписки —
+представление отдаёт `gather`. Первая часть выполняется в потоке
+запроса, остальные — в пуле из `VIEW_THREADS` потоков. Модуль sqlite3
+отпускает GIL на время запроса к базе, так что чтения из базы в режиме
+WAL действительно идут параллельно.
+
+Поток пула берёт соединения из `core.pool` без ожидания и возвращает их
+после каждой части. Если свободного соединения нет, часть выполняется
+в потоке запроса: иначе потоки запросов могли бы занять весь пул и
+ждать друг друга. В потоке запроса выполняется всё и тогда, когда пула
+нет (`VIEW_THREADS = 0`) или запрос идёт внутри транзакции, чьих
+незафиксированных данных другие соединения не видят (так и в тестах).
+
+Выбранная для запроса реплика (`core.routers`) переносится в поток
+части, а замер `core.metrics` из него добавляется к замеру запроса.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, pool, routers
+
+executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global executor
+    with _executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.VIEW_THREADS,
+                thread_name_prefix='views',
+            )
+        return executor
+
+
+def in_transaction():
+    return any(
+        connection.in_atomic_block for connection in connections.all()
+    )
+
+
+def run(call, replica):
+    """Выполнить часть запроса в потоке пула."""
+    routers.set_replica(replica)
+    measurement = metrics.start()
+    try:
+        with pool.no_wait(), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.time_query)
+                )
+            return call(), measurement
+    finally:
+        metrics.stop()
+        routers.release()
+        connections.close_all()
+
+
+def gather(*calls):
+    """Выполнить независимые `calls` одновременно; список их результатов."""
+    if len(calls) < 2 or not settings.VIEW_THREADS or in_transaction():
+        return [call() for call in calls]
+    replica = routers.replica()
+    futures = [
+        get_executor().submit(run, call, replica) for call in calls[1:]
+    ]
+    results = [calls[0]()]
+    for call, future in zip(calls[1:], futures):
+        try:
+            result, measurement = future.result()
+        except pool.Exhausted:
+            result = call()
+        else:
+            metrics.merge(measurement)
+        results.append(result)
+    return results
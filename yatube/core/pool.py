@@ -0,0 +1,247 @@
+"""Пул соединений с базой на процесс.
+
+Django открывает соединение в каждом потоке заново, а с
+`CONN_MAX_AGE=0` ещё и закрывает его в конце каждого запроса. Бэкенд
+`core.backends.sqlite3` вместо этого берёт готовое соединение из пула
+и возвращает его туда при закрытии, так что запрос не тратит время на
+открытие файла, прагмы и регистрацию функций SQLite.
+
+Настройки — `DATABASE_POOL`:
+
+* `SIZE` — сколько соединений на базу может быть открыто в процессе;
+  поток, которому не хватило, ждёт не дольше `TIMEOUT` секунд;
+* `MIN` — сколько соединений открыть при старте процесса (`warm_up`);
+* `MAX_AGE` — через сколько секунд после открытия соединение
+  закрывается и открывается заново;
+* `HEALTH_CHECK_IDLE` — соединение, пролежавшее без дела дольше
+  стольких секунд, перед выдачей проверяется запросом `SELECT 1`.
+
+Внутри `no_wait()` поток не ждёт соединения, а сразу получает
+`Exhausted`: так берут соединения потоки `core.parallel`.
+
+Пул принадлежит процессу: соединения SQLite нельзя использовать после
+`fork`, поэтому дочерний процесс забывает пулы родителя (`forget`), а
+`warm_up` вызывается уже в рабочем процессе — из хука `post_fork`
+WSGI-сервера или при старте ASGI-приложения (`lifespan`).
+
+Счётчики пула отдаются в /metrics/ (`core.metrics.pool_lines`).
+"""
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.utils import load_backend
+
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+COUNTERS = (
+    'created', 'acquired', 'waits', 'wait_seconds', 'recycled',
+    'health_check_failures',
+)
+
+
+class Exhausted(OperationalError):
+    """Все соединения пула заняты."""
+
+
+@contextmanager
+def no_wait():
+    """Не ждать соединения в этом потоке, а сразу бросать `Exhausted`."""
+    previous = getattr(_local, 'no_wait', False)
+    _local.no_wait = True
+    try:
+        yield
+    finally:
+        _local.no_wait = previous
+
+
+class Entry:
+    __slots__ = ('connection', 'created', 'released')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.released = monotonic()
+
+
+class ConnectionPool:
+    """Соединения одной базы: свободные и выданные потокам."""
+
+    def __init__(self, size, timeout, max_age, health_check_idle):
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_idle = health_check_idle
+        self.idle = deque()
+        self.in_use = {}
+        self.opening = 0
+        self.condition = threading.Condition()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    @property
+    def total(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def acquire(self, connect):
+        """Соединение и признак того, что оно взято из пула.
+
+        Если свободных нет, а пул не заполнен, открывается новое
+        соединение через `connect()`.
+        """
+        started = perf_counter()
+        timeout = 0 if getattr(_local, 'no_wait', False) else self.timeout
+        waited = False
+        with self.condition:
+            while not self.idle and self.total >= self.size:
+                waited = True
+                remaining = timeout - (perf_counter() - started)
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    raise Exhausted(
+                        f'Все {self.size} соединений пула заняты'
+                    )
+            entry = self.idle.pop() if self.idle else None
+            # Место занято сразу, пока соединение проверяется или
+            # открывается без блокировки.
+            self.opening += 1
+            self.counters['acquired'] += 1
+            if waited:
+                self.counters['waits'] += 1
+                self.counters['wait_seconds'] += perf_counter() - started
+        entry = self.checked(entry)
+        reused = entry is not None
+        try:
+            if not reused:
+                entry = Entry(connect())
+        finally:
+            with self.condition:
+                self.opening -= 1
+                if entry is not None:
+                    self.in_use[id(entry.connection)] = entry
+                    self.counters['created'] += not reused
+                else:
+                    self.condition.notify()
+        return entry.connection, reused
+
+    def checked(self, entry):
+        """Соединение из пула, если оно ещё годится."""
+        if entry is None:
+            return None
+        now = monotonic()
+        if now - entry.created > self.max_age:
+            self.discard(entry.connection, 'recycled')
+            return None
+        if now - entry.released > self.health_check_idle:
+            try:
+                entry.connection.execute('SELECT 1').fetchall()
+            except Exception:
+                self.discard(entry.connection, 'health_check_failures')
+                return None
+        return entry
+
+    def discard(self, connection, counter):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.counters[counter] += 1
+
+    def release(self, connection):
+        with self.condition:
+            entry = self.in_use.pop(id(connection), None)
+        if entry is None:
+            connection.close()
+            return
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            self.discard(connection, 'health_check_failures')
+            entry = None
+        with self.condition:
+            if entry is not None:
+                entry.released = monotonic()
+                self.idle.append(entry)
+            self.condition.notify()
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for entry in idle:
+            entry.connection.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                **self.counters,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+            }
+
+
+def get(alias):
+    """Пул базы `alias`; создаётся при первом обращении."""
+    options = settings.DATABASE_POOL
+    key = alias, connections.databases[alias]['NAME']
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                size=options['SIZE'],
+                timeout=options['TIMEOUT'],
+                max_age=options['MAX_AGE'],
+                health_check_idle=options['HEALTH_CHECK_IDLE'],
+            )
+        return _pools[key]
+
+
+def stats():
+    """Счётчики всех пулов по псевдониму базы."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {alias: pool.stats() for (alias, _), pool in pools}
+
+
+def reset():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+def forget():
+    """Забыть пулы, унаследованные от родителя при `fork`.
+
+    Соединения не закрываются: ими продолжает пользоваться родитель.
+    """
+    global _pools_lock
+    # Блокировку мог держать другой поток родителя в момент fork.
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=forget)
+
+
+def warm_up():
+    """Открыть `MIN` соединений каждой базы с пулом при старте процесса."""
+    for alias in connections:
+        settings_dict = connections.databases[alias]
+        backend = load_backend(settings_dict['ENGINE'])
+        if not getattr(backend.DatabaseWrapper, 'pooled', False):
+            continue
+        wrappers = [
+            backend.DatabaseWrapper(settings_dict, alias)
+            for _ in range(settings.DATABASE_POOL['MIN'])
+        ]
+        if not wrappers or wrappers[0].is_in_memory_db():
+            continue
+        for wrapper in wrappers:
+            wrapper.ensure_connection()
+        for wrapper in wrappers:
+            wrapper.close()
@@ -0,0 +1,135 @@
+"""Профилирование отрисовки шаблонов.
+
+Включается настройкой `TEMPLATE_PROFILING` (см. `CoreConfig.ready`)
+или контекстным менеджером `profiling()`. Пока профилирование
+включено, время отрисовки каждого шаблона (в том числе подключённых
+через `{% include %}` и `{% extends %}`) и каждого вхождения тегов,
+отмеченных `profile_tag` (миниатюры), копится по имени. Для каждого
+имени хранится полное время и собственное — без вложенных шаблонов
+и тегов: по собственному времени видно, какой фрагмент дорог сам
+по себе.
+
+Отчёт отдаёт `report()`; он же попадает на /metrics/ и в вывод
+`benchmark --profile-templates`.
+"""
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.template.base import Node, Template
+
+_local = threading.local()
+_lock = threading.Lock()
+_stats = {}
+_state = {'render': None}
+
+# Счётчики ключа: вызовы, полное время, собственное время, максимум.
+CALLS, SECONDS, SELF_SECONDS, MAX_SECONDS = range(4)
+
+
+def enabled():
+    return _state['render'] is not None
+
+
+def observe(key, seconds, self_seconds):
+    with _lock:
+        stats = _stats.setdefault(key, [0, 0.0, 0.0, 0.0])
+        stats[CALLS] += 1
+        stats[SECONDS] += seconds
+        stats[SELF_SECONDS] += self_seconds
+        stats[MAX_SECONDS] = max(stats[MAX_SECONDS], seconds)
+
+
+@contextmanager
+def measure(kind, name):
+    """Замерить фрагмент, если профилирование включено."""
+    if not enabled():
+        yield
+        return
+    stack = _local.__dict__.setdefault('stack', [])
+    stack.append(0.0)
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        seconds = perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += seconds
+        observe((kind, name), seconds, seconds - children)
+
+
+def profiled_render(template, context):
+    with measure('template', template.name or '<string>'):
+        render = _state['render'] or Template._render
+        return render(template, context)
+
+
+class ProfiledNode(Node):
+    """Узел тега, замеряемый под именем «шаблон:строка»."""
+
+    def __init__(self, kind, node):
+        self.kind = kind
+        self.node = node
+
+    def render(self, context):
+        name = f'{self.origin.template_name}:{self.token.lineno}'
+        with measure(self.kind, name):
+            return self.node.render(context)
+
+
+def profile_tag(register, name, kind):
+    """Замерять каждое вхождение тега `name` библиотеки `register`."""
+    compile_function = register.tags[name]
+
+    def compile_profiled(parser, token):
+        return ProfiledNode(kind, compile_function(parser, token))
+
+    register.tag(name, compile_profiled)
+
+
+def install():
+    if not enabled():
+        _state['render'] = Template._render
+        Template._render = profiled_render
+
+
+def uninstall():
+    if enabled():
+        Template._render = _state['render']
+        _state['render'] = None
+
+
+@contextmanager
+def profiling():
+    installed = enabled()
+    install()
+    try:
+        yield
+    finally:
+        if not installed:
+            uninstall()
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def report():
+    """Замеры по убыванию собственного времени."""
+    with _lock:
+        stats = {key: list(value) for key, value in _stats.items()}
+    return [
+        {
+            'kind': kind,
+            'name': name,
+            'calls': value[CALLS],
+            'seconds': round(value[SECONDS], 6),
+            'self_seconds': round(value[SELF_SECONDS], 6),
+            'max_seconds': round(value[MAX_SECONDS], 6),
+        }
+        for (kind, name), value in sorted(
+            stats.items(), key=lambda item: -item[1][SELF_SECONDS]
+        )
+    ]
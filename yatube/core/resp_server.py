@@ -0,0 +1,171 @@
+"""Небольшой сервер с протоколом Redis для тестов и локальной отладки.
+
+Понимает только команды, которыми пользуется
+`core.backends.redis.RespCache`, и хранит данные в памяти процесса.
+Запускается в отдельном потоке:
+
+    server = RespServer()
+    server.start()
+    ...  # LOCATION = server.url
+    server.stop()
+"""
+import socketserver
+import threading
+import time
+
+
+def integer(value):
+    return b':%d\r\n' % value
+
+
+def bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def error(message):
+    return b'-ERR %s\r\n' % message.encode()
+
+
+OK = b'+OK\r\n'
+
+
+class Store:
+    """Ключи со сроками жизни в абсолютном времени `time.monotonic()`."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.commands = 0
+
+    def alive(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, name, *args):
+        with self.lock:
+            self.commands += 1
+            handler = getattr(self, f'cmd_{name.decode().lower()}', None)
+            if handler is None:
+                return error(f'unknown command {name!r}')
+            try:
+                return handler(*args)
+            except (TypeError, ValueError) as exc:
+                return error(str(exc))
+
+    def cmd_ping(self):
+        return b'+PONG\r\n'
+
+    def cmd_select(self, db):
+        return OK
+
+    def cmd_get(self, key):
+        return bulk(self.alive(key))
+
+    def cmd_mget(self, *keys):
+        return b'*%d\r\n' % len(keys) + b''.join(
+            bulk(self.alive(key)) for key in keys
+        )
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'PX' in options:
+            expires = int(options[options.index(b'PX') + 1]) / 1000
+        if b'EX' in options:
+            expires = int(options[options.index(b'EX') + 1])
+        exists = self.alive(key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return bulk(None)
+        self.data[key] = (
+            value, None if expires is None else time.monotonic() + expires
+        )
+        return OK
+
+    def cmd_del(self, *keys):
+        removed = [key for key in keys if self.alive(key) is not None]
+        for key in removed:
+            del self.data[key]
+        return integer(len(removed))
+
+    def cmd_exists(self, *keys):
+        return integer(sum(self.alive(key) is not None for key in keys))
+
+    def cmd_incrby(self, key, delta):
+        value = int(self.alive(key) or 0) + int(delta)
+        expires = self.data.get(key, (None, None))[1]
+        self.data[key] = (str(value).encode(), expires)
+        return integer(value)
+
+    def cmd_pexpire(self, key, milliseconds):
+        value = self.alive(key)
+        if value is None:
+            return integer(0)
+        self.data[key] = (value, time.monotonic() + int(milliseconds) / 1000)
+        return integer(1)
+
+    def cmd_persist(self, key):
+        value = self.alive(key)
+        if value is None or self.data[key][1] is None:
+            return integer(0)
+        self.data[key] = (value, None)
+        return integer(1)
+
+    def cmd_pttl(self, key):
+        if self.alive(key) is None:
+            return integer(-2)
+        expires = self.data[key][1]
+        if expires is None:
+            return integer(-1)
+        return integer(int((expires - time.monotonic()) * 1000))
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return OK
+
+
+def read_command(stream):
+    line = stream.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int(stream.readline()[1:])
+        args.append(stream.read(length + 2)[:-2])
+    return args
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            command = read_command(self.rfile)
+            if not command:
+                return
+            self.wfile.write(self.server.store.execute(*command))
+
+
+class RespServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,71 @@
+"""Чтение из реплик для лент.
+
+Записи всегда идут в `default`. Чтения уходят в реплику только в
+представлениях из `REPLICA_READ_VIEWS`, и только когда их включил
+`ReplicaMiddleware`; все остальные запросы, команды и тесты читают из
+основной базы. Реплика выбирается одна на запрос, чтобы страница
+не собиралась из разных снимков.
+
+Реплики отстают от основной базы не больше чем на
+`REPLICA_LAG_TOLERANCE` секунд. Столько же после своей записи
+пользователь читает из основной базы и видит то, что записал.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+
+_local = threading.local()
+
+# Сессии читаются из основной базы: иначе только что вошедший
+# пользователь может оказаться анонимом на отстающей реплике.
+PRIMARY_APPS = {'sessions'}
+
+
+def use_replica():
+    """Читать из случайной реплики до конца запроса."""
+    replicas = settings.DATABASE_REPLICAS
+    _local.replica = random.choice(replicas) if replicas else None
+
+
+def set_replica(alias):
+    """Читать из реплики `alias`, выбранной запросом в другом потоке."""
+    _local.replica = alias
+
+
+def replica():
+    return getattr(_local, 'replica', None)
+
+
+def release():
+    """Вернуть чтение в основную базу; True, если была запись."""
+    wrote = getattr(_local, 'wrote', False)
+    _local.replica = None
+    _local.wrote = False
+    return wrote
+
+
+def recently_written(moment):
+    """Могла ли запись в момент `moment` ещё не дойти до реплик."""
+    return time.time() - moment < settings.REPLICA_LAG_TOLERANCE
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        return replica()
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает в реплики вместе с данными.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,22 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    """Доступ к /metrics/: по токену, если он задан, иначе по адресу."""
+    if settings.METRICS_TOKEN:
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {settings.METRICS_TOKEN}'.encode(),
+        )
+    allowed = settings.METRICS_ALLOWED_IPS
+    return not allowed or request.META.get('REMOTE_ADDR') in allowed
+
+
+def prometheus_metrics(request):
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        metrics.exposition(), content_type='text/plain; version=0.0.4'
+    )
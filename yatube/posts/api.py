@@ -0,0 +1,427 @@
+"""JSON API постов, групп, комментариев и подписок.
+
+Строки читаются через `values()` и переводятся в JSON по описанию
+полей ресурса (`Resource`), без создания объектов моделей. Клиент
+может запросить только нужные поля: `?fields=id,text`.
+
+Посты и комментарии листаются курсорами (`after`/`before`), группы и
+подписки — номерами страниц. Запись проверяется теми же формами, что
+и на сайте, а вход — та же сессия, что у приложения `users`: клиент
+получает cookie `csrftoken` из `GET session/`, входит через
+`POST session/` и дальше присылает заголовок `X-CSRFToken`.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import login, logout
+from django.contrib.auth.forms import AuthenticationForm
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from yatube import db
+
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CursorPaginator
+
+
+class ApiError(Exception):
+    """Ошибка запроса; с `field` — ошибка поля, как у формы."""
+
+    def __init__(self, message, status=400, field=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.field = field
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """Поля ресурса: имя в JSON, путь для `values()` и преобразование.
+
+    `keys` — пути, которые нужны всегда (курсор, порядок), даже если
+    клиент их не просил.
+    """
+
+    def __init__(self, queryset, fields, keys=(), annotations=None):
+        self.queryset = queryset
+        self.fields = {}
+        for name, spec in fields.items():
+            lookup, convert = spec if isinstance(spec, tuple) else (spec, None)
+            self.fields[name] = lookup, convert
+        self.keys = keys
+        self.annotations = annotations or {}
+
+    def names(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        names = [name for name in requested.split(',') if name]
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise ApiError(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            )
+        return names
+
+    def rows(self, names, queryset=None):
+        queryset = self.queryset if queryset is None else queryset
+        for name in names:
+            if name in self.annotations:
+                queryset = self.annotations[name](queryset)
+        lookups = {self.fields[name][0] for name in names}
+        return queryset.values(*lookups | set(self.keys))
+
+    def serialize(self, row, names):
+        item = {}
+        for name in names:
+            lookup, convert = self.fields[name]
+            value = row[lookup]
+            item[name] = convert(value) if convert else value
+        return item
+
+
+POSTS = Resource(
+    Post.objects.all(),
+    {
+        'id': 'pk',
+        'text': 'text',
+        'pub_date': ('pub_date', isoformat),
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': ('image', image_url),
+        'comment_count': 'comment_count',
+    },
+    keys=('pub_date', 'pk'),
+    annotations={'comment_count': lambda posts: posts.with_comment_count()},
+)
+COMMENTS = Resource(
+    Comment.objects.all(),
+    {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': ('created', isoformat),
+    },
+    keys=('created', 'pk'),
+)
+GROUPS = Resource(
+    Group.objects.order_by('pk'),
+    {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    keys=('slug',),
+)
+FOLLOWS = Resource(
+    Follow.objects.order_by('pk'),
+    {'author': 'author__username'},
+)
+
+
+def endpoint(*methods):
+    """Представление API: разрешённые методы и ошибки в JSON."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error('Метод не поддерживается', 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                if exc.field:
+                    return JsonResponse(
+                        {'errors': {exc.field: [exc.message]}},
+                        status=exc.status,
+                    )
+                return error(exc.message, exc.status)
+            except Http404:
+                return error('Не найдено', 404)
+        return wrapper
+    return decorator
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def form_error(form):
+    return JsonResponse({'errors': form.errors}, status=400)
+
+
+def payload(request):
+    """Тело запроса: JSON или обычная форма."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError('Тело запроса — не JSON')
+        if not isinstance(data, dict):
+            raise ApiError('Ожидается объект JSON')
+        return data
+    return request.POST.dict()
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужно войти', 401)
+    return request.user
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def page_link(request, **params):
+    query = request.GET.copy()
+    for name in ('after', 'before', 'page'):
+        query.pop(name, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def listing(request, resource, queryset=None, descending=True):
+    """Страница ресурса: курсоры, если у ресурса есть ключ порядка."""
+    names = resource.names(request)
+    rows = resource.rows(names, queryset)
+    cursor = len(resource.keys) == 2
+    page = CursorPaginator(
+        rows, page_size(request),
+        keys=resource.keys if cursor else None,
+        descending=descending,
+    ).get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    if cursor:
+        next_link = page.has_next() and page_link(
+            request, after=page.next_cursor
+        )
+        previous_link = page.has_previous() and page_link(
+            request, before=page.previous_cursor
+        )
+    else:
+        next_link = page.has_next() and page_link(
+            request, page=page.next_page_number()
+        )
+        previous_link = page.has_previous() and page_link(
+            request, page=page.previous_page_number()
+        )
+    return JsonResponse({
+        'results': [resource.serialize(row, names) for row in page],
+        'next': next_link or None,
+        'previous': previous_link or None,
+    })
+
+
+def detail(request, resource, status=200, **lookup):
+    names = resource.names(request)
+    row = get_object_or_404(resource.rows(names), **lookup)
+    return JsonResponse(resource.serialize(row, names), status=status)
+
+
+def object_id(value):
+    """Id из запроса: целое, которое помещается в 64-битный столбец."""
+    number = int(value)
+    if not -2 ** 63 <= number < 2 ** 63:
+        raise ValueError(f'Id вне диапазона: {value}')
+    return number
+
+
+def batch(request, resource, param, lookup, convert=str):
+    """Несколько объектов одним запросом в порядке `?param=a,b,c`."""
+    try:
+        values = [
+            convert(value) for value in request.GET.get(param, '').split(',')
+            if value
+        ]
+    except ValueError:
+        raise ApiError(f'Неверный список {param}')
+    if len(values) > settings.API_BATCH_SIZE:
+        raise ApiError(f'Не больше {settings.API_BATCH_SIZE} за запрос')
+    names = resource.names(request)
+    rows = {
+        row[lookup]: row for row in resource.rows(names).filter(
+            **{f'{lookup}__in': values}
+        )
+    }
+    return JsonResponse({
+        'results': [
+            resource.serialize(rows[value], names)
+            for value in values if value in rows
+        ],
+    })
+
+
+def post_data(data, post=None):
+    """Данные для `PostForm`: группа приходит слагом."""
+    fields = {
+        'text': post.text if post else '',
+        'group': post.group_id if post else None,
+    }
+    for name in ('text', 'group'):
+        if data.get(name) is not None and not isinstance(data[name], str):
+            raise ApiError('Ожидается строка', field=name)
+    if 'text' in data:
+        fields['text'] = data['text']
+    if data.get('group'):
+        fields['group'] = Group.objects.filter(
+            slug=data['group']
+        ).values_list('pk', flat=True).first()
+        if fields['group'] is None:
+            raise ApiError('Группа не найдена', field='group')
+    elif 'group' in data:
+        fields['group'] = None
+    return fields
+
+
+@endpoint('GET', 'POST')
+def posts(request):
+    if request.method == 'GET':
+        queryset = POSTS.queryset
+        if request.GET.get('group'):
+            queryset = queryset.filter(group__slug=request.GET['group'])
+        if request.GET.get('author'):
+            queryset = queryset.filter(
+                author__username=request.GET['author']
+            )
+        return listing(request, POSTS, queryset)
+    user = require_user(request)
+    form = PostForm(
+        post_data(payload(request)), files=request.FILES or None
+    )
+    if not form.is_valid():
+        return form_error(form)
+    with db.write():
+        post = form.save(commit=False)
+        post.author = user
+        post.save()
+    return detail(request, POSTS, status=201, pk=post.pk)
+
+
+@endpoint('GET')
+def post_batch(request):
+    return batch(request, POSTS, 'ids', 'pk', convert=object_id)
+
+
+@endpoint('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    if request.method == 'GET':
+        return detail(request, POSTS, pk=post_id)
+    user = require_user(request)
+    instance = get_object_or_404(Post, pk=post_id)
+    if instance.author_id != user.pk:
+        raise ApiError('Пост принадлежит другому автору', 403)
+    if request.method == 'DELETE':
+        with db.write():
+            instance.delete()
+        return HttpResponse(status=204)
+    # request.POST заполняется только для POST.
+    if request.content_type != 'application/json':
+        raise ApiError('PATCH принимает только application/json', 415)
+    form = PostForm(post_data(payload(request), instance), instance=instance)
+    if not form.is_valid():
+        return form_error(form)
+    with db.write():
+        form.save()
+    return detail(request, POSTS, pk=post_id)
+
+
+@endpoint('GET', 'POST')
+def comments(request, post_id):
+    if request.method == 'GET':
+        get_object_or_404(Post.objects.values('pk'), pk=post_id)
+        return listing(
+            request, COMMENTS, COMMENTS.queryset.filter(post_id=post_id),
+            descending=False,
+        )
+    user = require_user(request)
+    get_object_or_404(Post.objects.values('pk'), pk=post_id)
+    form = CommentForm(payload(request))
+    if not form.is_valid():
+        return form_error(form)
+    with db.write():
+        comment = form.save(commit=False)
+        comment.author = user
+        comment.post_id = post_id
+        comment.save()
+    return detail(request, COMMENTS, status=201, pk=comment.pk)
+
+
+@endpoint('GET')
+def groups(request):
+    return listing(request, GROUPS)
+
+
+@endpoint('GET')
+def group_batch(request):
+    return batch(request, GROUPS, 'slugs', 'slug')
+
+
+@endpoint('GET')
+def group(request, slug):
+    return detail(request, GROUPS, slug=slug)
+
+
+@endpoint('GET', 'POST')
+def follows(request):
+    user = require_user(request)
+    if request.method == 'GET':
+        return listing(
+            request, FOLLOWS, FOLLOWS.queryset.filter(user=user)
+        )
+    username = payload(request).get('author')
+    author = get_object_or_404(User, username=username)
+    if author == user:
+        raise ApiError('Нельзя подписаться на себя')
+    with db.write():
+        _, created = Follow.objects.get_or_create(user=user, author=author)
+    return JsonResponse({'author': username}, status=201 if created else 200)
+
+
+@endpoint('DELETE')
+def follow(request, username):
+    user = require_user(request)
+    with db.write():
+        get_object_or_404(
+            Follow, user=user, author__username=username
+        ).delete()
+    return HttpResponse(status=204)
+
+
+def session_user(user):
+    if not user.is_authenticated:
+        return {'user': None}
+    return {'user': {'username': user.username}}
+
+
+@endpoint('GET', 'POST', 'DELETE')
+@ensure_csrf_cookie
+def session(request):
+    if request.method == 'POST':
+        form = AuthenticationForm(request, payload(request))
+        if not form.is_valid():
+            return form_error(form)
+        login(request, form.get_user())
+    elif request.method == 'DELETE':
+        logout(request)
+    return JsonResponse(session_user(request.user))
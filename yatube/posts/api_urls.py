@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('session/', api.session, name='session'),
+    path('posts/', api.posts, name='posts'),
+    path('posts/batch/', api.post_batch, name='post_batch'),
+    path('posts/<int:post_id>/', api.post, name='post'),
+    path('posts/<int:post_id>/comments/', api.comments, name='comments'),
+    path('groups/', api.groups, name='groups'),
+    path('groups/batch/', api.group_batch, name='group_batch'),
+    path('groups/<slug:slug>/', api.group, name='group'),
+    path('follows/', api.follows, name='follows'),
+    path('follows/<str:username>/', api.follow, name='follow'),
+]
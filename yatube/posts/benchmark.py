@@ -0,0 +1,494 @@
+"""Нагрузочный прогон страниц и форм приложения posts.
+
+`seed()` наполняет базу правдоподобными данными: авторы с картинками в
+постах, подписки и комментарии со степенным распределением популярности.
+`plan()` готовит запросы к каждой странице, `run()` прогоняет их через
+WSGI-приложение `yatube.wsgi.application` в несколько потоков, а
+`run_asgi()` — через ASGI-обёртку `core.asgi.ASGIHandler` с тем же
+числом потоков и многими одновременными клиентами. Медленного клиента
+изображает задержка при отдаче ответа: WSGI-сервер держит на ней поток,
+ASGI — нет. `summary()` сводит задержки, число запросов к БД и RPS в
+отчёт.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.asgi import ASGIHandler
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import auto_now_add_disabled
+
+DAYS = 365
+PREFIX = 'bench'
+IMAGE_SIZE = (1280, 720)
+WORDS = (
+    'утро', 'город', 'книга', 'дорога', 'море', 'кошка', 'собака', 'лес',
+    'поезд', 'работа', 'музыка', 'кофе', 'дождь', 'солнце', 'друзья',
+    'горы', 'читать', 'гулять', 'писать', 'смотреть', 'новый', 'старый',
+    'красивый', 'долгий', 'тихий', 'сегодня', 'вчера', 'снова', 'очень',
+    'наконец', 'путешествие', 'фотография', 'история', 'выходные',
+)
+READ_ENDPOINTS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'search',
+)
+WRITE_ENDPOINTS = (
+    'post_create', 'add_comment', 'profile_follow', 'profile_unfollow',
+)
+ENDPOINTS = READ_ENDPOINTS + WRITE_ENDPOINTS
+SERVERS = ('wsgi', 'asgi')
+# Число запросов к БД из заголовка Server-Timing (core.middleware).
+DB_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+Call = namedtuple(
+    'Call', 'endpoint method path query body content_type session'
+)
+Session = namedtuple('Session', 'username cookie csrf_token')
+Result = namedtuple('Result', 'endpoint status seconds queries')
+
+
+def zipf_weights(count, exponent=1.0):
+    """Веса «по Ципфу»: k-й по популярности элемент весит 1 / k^s."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def sentence(rng, low=5, high=40):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def make_images(rng, count):
+    """Сохранить в хранилище `count` картинок и вернуть их имена."""
+    names = []
+    for number in range(count):
+        buffer = BytesIO()
+        Image.new(
+            'RGB', IMAGE_SIZE,
+            tuple(rng.randrange(256) for _ in range(3))
+        ).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/{PREFIX}_{number}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def seed(users=200, posts=2000, groups=10, comments=5000, follows=20,
+         images=10, random_seed=0):
+    """Наполнить пустую базу данными для прогона.
+
+    Число подписок на пользователя распределено по Парето со средним
+    `follows`, а выбор автора, поста для комментария и автора поста
+    взвешен по Ципфу, поэтому есть и «звёзды», и длинный хвост.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    User.objects.bulk_create(
+        User(
+            username=f'{PREFIX}{number}',
+            first_name=rng.choice(WORDS).capitalize(),
+            password='!',
+        )
+        for number in range(users)
+    )
+    Group.objects.bulk_create(
+        Group(
+            title=f'Группа {number}',
+            slug=f'{PREFIX}-{number}',
+            description=sentence(rng),
+        )
+        for number in range(groups)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    image_names = make_images(rng, images) + ['']
+    rng.shuffle(user_ids)
+    popularity = zipf_weights(len(user_ids))
+
+    post_fields = [Post._meta.get_field('pub_date')]
+    comment_fields = [Comment._meta.get_field('created')]
+    with auto_now_add_disabled(*post_fields, *comment_fields):
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author_id=author_id,
+                    group_id=rng.choice(group_ids),
+                    image=rng.choice(image_names),
+                    text=sentence(rng),
+                    pub_date=now - timedelta(seconds=rng.uniform(
+                        0, DAYS * 24 * 60 * 60
+                    )),
+                )
+                for author_id in rng.choices(
+                    user_ids, weights=popularity, k=posts
+                )
+            )
+        )
+        post_dates = list(Post.objects.values_list('pk', 'pub_date'))
+        rng.shuffle(post_dates)
+        commented = rng.choices(
+            post_dates, weights=zipf_weights(len(post_dates)), k=comments
+        ) if post_dates else []
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=post_id,
+                    author_id=rng.choice(user_ids),
+                    text=sentence(rng, high=15),
+                    created=min(
+                        now, pub_date + timedelta(hours=rng.uniform(0, 72))
+                    ),
+                )
+                for post_id, pub_date in commented
+            )
+        )
+
+    pairs = set()
+    for user_id in user_ids:
+        wanted = min(
+            len(user_ids) - 1,
+            int(rng.paretovariate(1.5) * follows / 3),
+        )
+        authors = set()
+        while len(authors) < wanted:
+            author_id, = rng.choices(user_ids, weights=popularity)
+            if author_id != user_id:
+                authors.add(author_id)
+        pairs.update((user_id, author_id) for author_id in authors)
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sorted(pairs)
+    )
+
+    for command in (
+        'recount_stats', 'backfill_timeline', 'rebuild_search_index',
+        'generate_thumbnails',
+    ):
+        call_command(command, stdout=StringIO())
+
+
+def login(user):
+    client = Client()
+    client.force_login(user)
+    return Session(
+        user.username,
+        client.cookies[settings.SESSION_COOKIE_NAME].value,
+        _get_new_csrf_token(),
+    )
+
+
+def plan(endpoints=ENDPOINTS, requests=200, sessions=20, random_seed=0):
+    """Запросы к каждой из `endpoints` по `requests` штук.
+
+    Запросы залогиненных пользователей делятся между `sessions`
+    сессиями. Подписки `profile_follow` отменяет `profile_unfollow`,
+    поэтому второй должен идти после первого.
+    """
+    rng = random.Random(random_seed)
+    usernames = list(
+        User.objects.order_by('pk').values_list('username', flat=True)
+    )
+    slugs = list(Group.objects.order_by('pk').values_list('slug', flat=True))
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    readers = list(
+        User.objects.filter(follower__isnull=False).distinct().order_by('pk')
+    ) or list(User.objects.order_by('pk'))
+    logged_in = [
+        login(user)
+        for user in rng.sample(readers, min(sessions, len(readers)))
+    ]
+    following = defaultdict(set)
+    for user, author in Follow.objects.filter(
+        user__username__in=[session.username for session in logged_in]
+    ).values_list('user__username', 'author__username'):
+        following[user].add(author)
+    new_follows = []
+    for number in range(requests):
+        session = logged_in[number % len(logged_in)]
+        candidates = [
+            username for username in rng.sample(usernames, len(usernames))
+            if username != session.username
+            and username not in following[session.username]
+        ]
+        if candidates:
+            following[session.username].add(candidates[0])
+            new_follows.append((session, candidates[0]))
+
+    def get(endpoint, path, query=None, session=None):
+        return Call(
+            endpoint, 'GET', path, urlencode(query or {}), b'', '', session
+        )
+
+    def post(endpoint, path, data, session):
+        return Call(
+            endpoint, 'POST', path, '',
+            encode_multipart(BOUNDARY, data), MULTIPART_CONTENT, session,
+        )
+
+    builders = {
+        'index': lambda number: get(
+            'index', reverse('posts:index'),
+            {'page': rng.randint(1, 5)} if number % 2 else None,
+        ),
+        'group_posts': lambda number: get(
+            'group_posts',
+            reverse('posts:group_list', args=[rng.choice(slugs)]),
+        ),
+        'profile': lambda number: get(
+            'profile',
+            reverse('posts:profile', args=[rng.choice(usernames)]),
+        ),
+        'post_detail': lambda number: get(
+            'post_detail',
+            reverse('posts:post_detail', args=[rng.choice(post_ids)]),
+        ),
+        'follow_index': lambda number: get(
+            'follow_index', reverse('posts:follow_index'),
+            session=logged_in[number % len(logged_in)],
+        ),
+        'search': lambda number: get(
+            'search', reverse('posts:search'), {'q': rng.choice(WORDS)},
+        ),
+        'post_create': lambda number: post(
+            'post_create', reverse('posts:post_create'),
+            {'text': sentence(rng), 'group': ''},
+            logged_in[number % len(logged_in)],
+        ),
+        'add_comment': lambda number: post(
+            'add_comment',
+            reverse('posts:add_comment', args=[rng.choice(post_ids)]),
+            {'text': sentence(rng, high=15)},
+            logged_in[number % len(logged_in)],
+        ),
+        'profile_follow': lambda number: get(
+            'profile_follow',
+            reverse('posts:profile_follow', args=[new_follows[number][1]]),
+            session=new_follows[number][0],
+        ),
+        'profile_unfollow': lambda number: get(
+            'profile_unfollow',
+            reverse('posts:profile_unfollow', args=[new_follows[number][1]]),
+            session=new_follows[number][0],
+        ),
+    }
+    counts = dict.fromkeys(ENDPOINTS, requests)
+    counts['profile_follow'] = counts['profile_unfollow'] = len(new_follows)
+    if not slugs:
+        counts['group_posts'] = 0
+    if not post_ids:
+        counts['post_detail'] = counts['add_comment'] = 0
+    return {
+        endpoint: [builders[endpoint](number)
+                   for number in range(counts[endpoint])]
+        for endpoint in endpoints
+    }
+
+
+def environ(call):
+    cookies = ''
+    headers = {}
+    if call.session:
+        cookies = (
+            f'{settings.SESSION_COOKIE_NAME}={call.session.cookie}; '
+            f'{settings.CSRF_COOKIE_NAME}={call.session.csrf_token}'
+        )
+        headers['HTTP_X_CSRFTOKEN'] = call.session.csrf_token
+    return {
+        'REQUEST_METHOD': call.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': call.path,
+        'QUERY_STRING': call.query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': call.content_type,
+        'CONTENT_LENGTH': str(len(call.body)),
+        'HTTP_COOKIE': cookies,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(call.body),
+        'wsgi.errors': StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        **headers,
+    }
+
+
+def db_queries(server_timing):
+    match = DB_QUERIES.search(server_timing)
+    return int(match.group(1)) if match else 0
+
+
+def perform(application, call, delay=0):
+    """Выполнить запрос и замерить время и число запросов к БД.
+
+    `delay` секунд поток ждёт, отдавая ответ медленному клиенту.
+    """
+    responses = []
+
+    def start_response(status, headers, exc_info=None):
+        responses.append((status, dict(headers)))
+
+    started = time.perf_counter()
+    response = application(environ(call), start_response)
+    try:
+        for _ in response:
+            pass
+        time.sleep(delay)
+    finally:
+        response.close()
+    seconds = time.perf_counter() - started
+    status, headers = responses[0]
+    return Result(
+        call.endpoint, int(status.split()[0]), seconds,
+        db_queries(headers.get('Server-Timing', '')),
+    )
+
+
+def run(calls, concurrency=8, application=None, delay=0):
+    """Прогнать запросы `calls` в `concurrency` потоков.
+
+    Возвращает результаты и общее время прогона в секундах.
+    """
+    if application is None:
+        from yatube.wsgi import application
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(
+            lambda call: perform(application, call, delay), calls
+        ))
+        return results, time.perf_counter() - started
+
+
+def scope(call):
+    headers = [(b'host', b'testserver')]
+    if call.session:
+        headers += [
+            (b'cookie', (
+                f'{settings.SESSION_COOKIE_NAME}={call.session.cookie}; '
+                f'{settings.CSRF_COOKIE_NAME}={call.session.csrf_token}'
+            ).encode()),
+            (b'x-csrftoken', call.session.csrf_token.encode()),
+        ]
+    if call.body:
+        headers += [
+            (b'content-type', call.content_type.encode()),
+            (b'content-length', str(len(call.body)).encode()),
+        ]
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': call.method,
+        'scheme': 'http',
+        'path': call.path,
+        'query_string': call.query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+async def perform_asgi(application, call, delay=0):
+    """Асинхронный вариант `perform` для ASGI-приложения."""
+    requests = [{'type': 'http.request', 'body': call.body}]
+    response = {}
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response.update(message)
+        elif not message.get('more_body'):
+            await asyncio.sleep(delay)
+
+    started = time.perf_counter()
+    await application(scope(call), receive, send)
+    seconds = time.perf_counter() - started
+    headers = dict(response['headers'])
+    return Result(
+        call.endpoint, response['status'], seconds,
+        db_queries(headers.get(b'server-timing', b'').decode()),
+    )
+
+
+def run_asgi(calls, concurrency=8, clients=64, application=None, delay=0):
+    """Прогнать запросы `calls` через ASGI-приложение.
+
+    Запросы идут от `clients` одновременных клиентов, приложение
+    выполняет их в `concurrency` потоков.
+    """
+    if application is None:
+        from yatube.wsgi import application
+    handler = ASGIHandler(application, concurrency)
+
+    async def main():
+        pending = iter(calls)
+        results = []
+
+        async def client():
+            for call in pending:
+                results.append(await perform_asgi(handler, call, delay))
+
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return results
+
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        return results, time.perf_counter() - started
+    finally:
+        handler.close()
+
+
+def percentile(values, share):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * share // 100))
+    return ordered[int(rank) - 1]
+
+
+def summary(results, seconds):
+    latencies = [result.seconds * 1000 for result in results]
+    queries = [result.queries for result in results]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for result in results if result.status >= 400),
+        'statuses': dict(sorted(
+            Counter(str(result.status) for result in results).items()
+        )),
+        'rps': round(len(results) / seconds, 2) if seconds else None,
+        'latency_ms': {
+            f'p{share}': round(percentile(latencies, share), 3)
+            if latencies else None
+            for share in (50, 95, 99)
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries, default=None),
+        },
+    }
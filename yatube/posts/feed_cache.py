@@ -0,0 +1,165 @@
+"""Версии лент для кэширования фрагментов шаблонов.
+
+У каждой ленты (главная, группа, автор, подписки пользователя) есть
+версия в кэше. Она входит в ключ фрагмента вместе с курсором страницы
+и меняется сигналами при сохранении и удалении постов (после фиксации
+транзакции), поэтому с общим кэшем фрагменты можно хранить часами, не показывая
+устаревших данных.
+
+Версии хранятся бессрочно, только если кэш общий для всех процессов
+(`CACHE_SHARED`). В кэше процесса другие процессы не видят смены
+версии, поэтому версия живёт `FEED_VERSION_TIMEOUT` секунд и столько
+же может показываться устаревшая лента.
+
+Версия — время изменения ленты. Если ленту читают из реплики, которая
+могла ещё не получить изменение, фрагмент кэшируется ненадолго, чтобы
+не закрепить в кэше устаревшую страницу.
+
+Те же версии служат валидаторами условного GET (`conditional`): пока
+версии лент страницы не менялись, на `If-None-Match` и
+`If-Modified-Since` отвечаем 304 без запросов за постами и без
+отрисовки шаблона.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from core import routers
+
+PAGE_PARAMS = ('page', 'after', 'before', 'order')
+
+
+def version_key(scope):
+    return f'feed_version:{scope}'
+
+
+def new_version():
+    return int(time.time() * 1000000)
+
+
+def versions(*scopes):
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, settings.FEED_VERSION_TIMEOUT)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def request_versions(request, *scopes):
+    """Версии, прочитанные один раз за запрос."""
+    known = request.__dict__.setdefault('_feed_versions', {})
+    missing = [scope for scope in scopes if scope not in known]
+    if missing:
+        known.update(zip(missing, versions(*missing)))
+    return [known[scope] for scope in scopes]
+
+
+def bump(*scopes):
+    """Сменить версии лент после фиксации текущей транзакции.
+
+    Иначе читатель мог бы закэшировать под новой версией данные,
+    прочитанные до фиксации.
+    """
+    transaction.on_commit(lambda: cache.set_many(
+        {version_key(scope): new_version() for scope in scopes},
+        settings.FEED_VERSION_TIMEOUT,
+    ))
+
+
+def post_scopes(post, group_ids=()):
+    scopes = ['index', f'author:{post.author_id}']
+    if post.pk:
+        scopes.append(f'post:{post.pk}')
+    scopes.extend(
+        f'group:{group_id}'
+        for group_id in {post.group_id, *group_ids} if group_id
+    )
+    return scopes
+
+
+def follow_scopes(user):
+    return ['index', f'follow:{user.pk}']
+
+
+def page_key(request, scope_versions):
+    return ':'.join(
+        [*map(str, scope_versions),
+         *(request.GET.get(param, '') for param in PAGE_PARAMS)]
+    )
+
+
+def maybe_stale(scope_versions):
+    """Читаем из реплики, которая могла не получить последних изменений."""
+    return bool(routers.replica()) and routers.recently_written(
+        max(scope_versions) / 1000000
+    )
+
+
+def timeout(scope_versions):
+    if maybe_stale(scope_versions):
+        return settings.REPLICA_LAG_TOLERANCE
+    return settings.FEED_CACHE_TIMEOUT
+
+
+def context(request, *scopes):
+    scope_versions = request_versions(request, *scopes)
+    return {
+        'cache_key': page_key(request, scope_versions),
+        'cache_timeout': timeout(scope_versions),
+    }
+
+
+def validators(request, scopes, values=()):
+    """ETag и Last-Modified страницы, собранной из лент `scopes`.
+
+    `values` — то, что есть на странице помимо лент (например,
+    счётчики автора): они входят только в ETag. Last-Modified
+    отдаётся лишь анонимам и лишь когда версии описывают страницу
+    целиком, потому что вход на сайт и счётчики не меняют версий.
+    """
+    scope_versions = request_versions(request, *scopes)
+    if maybe_stale(scope_versions):
+        return None, None
+    parts = [
+        page_key(request, scope_versions),
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        *values,
+    ]
+    etag = hashlib.md5(
+        ':'.join(map(str, parts)).encode()
+    ).hexdigest()
+    if request.user.is_authenticated or values:
+        return etag, None
+    return etag, datetime.fromtimestamp(
+        max(scope_versions) / 1000000, timezone.utc
+    )
+
+
+def conditional(page):
+    """Декоратор условного GET по версиям лент.
+
+    `page(request, *args, **kwargs)` возвращает ленты страницы и
+    прочие значения для ETag (см. `validators`) и должен обходиться
+    без тяжёлых запросов.
+    """
+    def cached(request, *args, **kwargs):
+        if not hasattr(request, '_validators'):
+            request._validators = validators(
+                request, *page(request, *args, **kwargs)
+            )
+        return request._validators
+
+    return condition(
+        etag_func=lambda *args, **kwargs: cached(*args, **kwargs)[0],
+        last_modified_func=lambda *args, **kwargs: cached(
+            *args, **kwargs
+        )[1],
+    )
@@ -0,0 +1,131 @@
+"""Ленты RSS и Atom для главной, групп и авторов.
+
+Готовый документ кэшируется по версиям ленты из `feed_cache`, поэтому
+новый пост или его правка сразу меняют ключ, а повторные запросы
+отдаются из кэша. Клиенты, которые присылают `If-None-Match` или
+`If-Modified-Since`, получают 304 по тем же версиям.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+
+from . import feed_cache, views
+from .models import Group, Post, User
+
+
+class PostsFeed(Feed):
+    title = 'Последние обновления на сайте'
+    description = 'Новые посты всех авторов'
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).for_feed()[:settings.FEED_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).words(10)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return group.title
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        name = author.get_full_name() or author.username
+        return f'Посты пользователя {name}'
+
+    def description(self, author):
+        return self.title(author)
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+def author_scopes(request, username):
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username
+    )
+    return [f'author:{author_id}'], ()
+
+
+def syndication(feed_class, feed_type, scopes):
+    """Представление ленты с кэшем документа и условным GET."""
+    feed = feed_class()
+    feed.feed_type = feed_type
+
+    def page_scopes(request, *args, **kwargs):
+        request.feed_scopes = scopes(request, *args, **kwargs)[0]
+        return request.feed_scopes, ()
+
+    @feed_cache.conditional(page_scopes)
+    def view(request, *args, **kwargs):
+        scope_versions = feed_cache.request_versions(
+            request, *request.feed_scopes
+        )
+        key = 'syndication:{}:{}'.format(
+            request.path, ':'.join(map(str, scope_versions))
+        )
+        document = cache.get(key)
+        if document is None:
+            response = feed(request, *args, **kwargs)
+            document = response.content, response['Content-Type']
+            cache.set(key, document, feed_cache.timeout(scope_versions))
+        content, content_type = document
+        return HttpResponse(content, content_type=content_type)
+
+    return view
+
+
+index_rss = syndication(PostsFeed, Rss201rev2Feed, views.index_scopes)
+index_atom = syndication(PostsFeed, Atom1Feed, views.index_scopes)
+group_rss = syndication(GroupFeed, Rss201rev2Feed, views.group_scopes)
+group_atom = syndication(GroupFeed, Atom1Feed, views.group_scopes)
+author_rss = syndication(AuthorFeed, Rss201rev2Feed, author_scopes)
+author_atom = syndication(AuthorFeed, Atom1Feed, author_scopes)
@@ -0,0 +1,38 @@
+"""На каких авторов подписан зритель.
+
+Кнопка подписки у каждого автора на странице стоила бы отдельного
+запроса `exists()`. Вместо этого `followed_ids(user)` берёт список
+подписок пользователя из графа (`posts.graph`, он кэшируется по
+пользователю и сбрасывается после подписки и отписки) и запоминает его
+множеством на объекте пользователя, который живёт столько же, сколько
+запрос. Проверка автора — `is_following` или фильтр `follows_author`
+из `follow_status` — это поиск в множестве.
+"""
+from . import graph
+from .models import Follow
+
+ATTRIBUTE = '_followed_ids'
+
+
+def followed_ids(user):
+    """Множество id авторов, на которых подписан `user`."""
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, ATTRIBUTE, None)
+    if ids is None:
+        ids = frozenset(graph.following(user.pk))
+        setattr(user, ATTRIBUTE, ids)
+    return ids
+
+
+def is_following(user, author):
+    """Подписан ли `user` на `author` (пользователя или его id)."""
+    return getattr(author, 'pk', author) in followed_ids(user)
+
+
+def forget(follow):
+    """Забыть подписки пользователя `follow`, если он уже загружен."""
+    if Follow._meta.get_field('user').is_cached(follow):
+        user = follow.user
+        if hasattr(user, ATTRIBUTE):
+            delattr(user, ATTRIBUTE)
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -10,6 +12,12 @@ class PostForm(forms.ModelForm):
         group = forms.CharField(required=False)
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return images.process(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
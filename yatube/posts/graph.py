@@ -0,0 +1,175 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя в кэше лежат два списка смежности —
+на кого он подписан и кто подписан на него: отсортированные
+`array('i')` с id пользователей, сохранённые байтами (4 байта на
+подписку). Проверка подписки — двоичный поиск, число подписчиков —
+длина списка, общие подписки — пересечение двух отсортированных
+списков.
+
+Нет списка в кэше — он собирается запросом при чтении, для многих
+пользователей сразу одним запросом. Ключ списка содержит версию
+(`feed_cache.versions`), которую подписка и отписка меняют после
+фиксации транзакции. Версия читается до сборки списка, поэтому список,
+собранный по снимку базы до фиксации, остаётся под старой версией и
+больше не читается. Списки, собранные внутри транзакции, в кэш не
+кладутся, поэтому откаченная подписка в него не попадает.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import feed_cache
+from .models import Follow
+
+# Направление: поле Follow, по которому ищем, и поле со смежными id.
+FOLLOWING = 'following', 'user_id', 'author_id'
+FOLLOWERS = 'followers', 'author_id', 'user_id'
+
+
+def scope(direction, user_id):
+    return f'graph:{direction[0]}:{user_id}'
+
+
+def adjacency_key(direction, user_id, version):
+    return f'graph:{direction[0]}:{user_id}:{version}'
+
+
+def pack(ids):
+    return array('i', sorted(ids)).tobytes()
+
+
+def unpack(value):
+    ids = array('i')
+    ids.frombytes(value)
+    return ids
+
+
+def build(direction, user_ids):
+    _, field, other = direction
+    lists = defaultdict(list)
+    for user_id, other_id in Follow.objects.filter(**{
+        f'{field}__in': user_ids
+    }).order_by().values_list(field, other).iterator():
+        lists[user_id].append(other_id)
+    return {user_id: pack(lists[user_id]) for user_id in user_ids}
+
+
+def load_many(direction, user_ids):
+    """Списки смежности пользователей `user_ids` по их id."""
+    user_ids = list(user_ids)
+    keys = {
+        adjacency_key(direction, user_id, version): user_id
+        for user_id, version in zip(user_ids, feed_cache.versions(*(
+            scope(direction, user_id) for user_id in user_ids
+        )))
+    }
+    values = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [user_id for user_id in keys.values() if user_id not in values]
+    if missing:
+        built = build(direction, missing)
+        # Внутри транзакции видны её незафиксированные подписки.
+        if not transaction.get_connection().in_atomic_block:
+            cache.set_many({
+                key: built[user_id] for key, user_id in keys.items()
+                if user_id in built
+            }, settings.GRAPH_TIMEOUT)
+        values.update(built)
+    return {user_id: unpack(value) for user_id, value in values.items()}
+
+
+def load(direction, user_id):
+    return load_many(direction, [user_id])[user_id]
+
+
+def following(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь."""
+    return load(FOLLOWING, user_id)
+
+
+def followers(user_id):
+    """Отсортированные id подписчиков пользователя."""
+    return load(FOLLOWERS, user_id)
+
+
+def contains(ids, user_id):
+    position = bisect_left(ids, user_id)
+    return position < len(ids) and ids[position] == user_id
+
+
+def is_following(user_id, author_id):
+    return contains(following(user_id), author_id)
+
+
+def is_mutual(user_id, other_id):
+    """Подписаны ли пользователи друг на друга."""
+    return is_following(user_id, other_id) and is_following(
+        other_id, user_id
+    )
+
+
+def followers_count(user_id):
+    return len(followers(user_id))
+
+
+def intersect(first, second):
+    """Пересечение отсортированных списков id.
+
+    Каждый элемент короткого списка ищется двоичным поиском в длинном
+    с той позиции, где остановился предыдущий: O(m log n), и для
+    списков одной длины не хуже слияния.
+    """
+    if len(first) > len(second):
+        first, second = second, first
+    result = array('i')
+    position = 0
+    for user_id in first:
+        position = bisect_left(second, user_id, position)
+        if position == len(second):
+            break
+        if second[position] == user_id:
+            result.append(user_id)
+    return result
+
+
+def mutual(user_id):
+    """Id тех, с кем пользователь подписан друг на друга."""
+    return intersect(following(user_id), followers(user_id))
+
+
+def common_following(user_id, other_id):
+    """Id авторов, на которых подписаны оба пользователя."""
+    lists = load_many(FOLLOWING, [user_id, other_id])
+    return intersect(lists[user_id], lists[other_id])
+
+
+def suggestions(user_id, limit=10):
+    """Кого предложить в подписки.
+
+    Авторы, на которых подписаны авторы пользователя (не больше
+    `GRAPH_SUGGESTION_SOURCES` из них), по числу таких подписок.
+    """
+    followed = following(user_id)
+    sources = list(followed[:settings.GRAPH_SUGGESTION_SOURCES])
+    counts = Counter()
+    for ids in load_many(FOLLOWING, sources).values():
+        counts.update(ids)
+    ranked = sorted(
+        (-count, candidate) for candidate, count in counts.items()
+        if candidate != user_id and not contains(followed, candidate)
+    )
+    return [candidate for _, candidate in ranked[:limit]]
+
+
+def changed(follow):
+    """Сменить версии списков обоих пользователей после фиксации."""
+    scopes = [
+        scope(FOLLOWING, follow.user_id), scope(FOLLOWERS, follow.author_id)
+    ]
+    feed_cache.bump(*scopes)
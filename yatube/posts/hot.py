@@ -0,0 +1,224 @@
+"""Буфер последних постов группы и обсуждаемые посты.
+
+Для каждой группы в кэше лежат `GROUP_HOT_POSTS` последних постов —
+дата и id, от новых к старым. Страница группы берёт из буфера id
+постов нужной страницы и загружает их по первичному ключу вместо
+сортировки всех постов группы. Сигналы добавляют пост в буфер при
+сохранении или переносе в группу и убирают при удалении или уходе из
+группы; если буфера в кэше нет, он собирается при следующем чтении.
+
+Для порядка «обсуждаемые» у постов буфера хранится счёт —
+число комментариев, где каждый комментарий со временем теряет вес
+вдвое за `GROUP_TRENDING_HALF_LIFE` секунд. Счёт хранится
+логарифмом суммы `exp(t * ln 2 / half_life)` по комментариям: новый
+комментарий прибавляется без пересчёта остальных, а порядок по такому
+числу совпадает с порядком по затухающему счёту в любой момент.
+
+Сигналы меняют буфер только после фиксации транзакции записи, так что
+откаченный пост в буфер не попадает. Изменения идут под блокировкой в
+кэше; если её держит другой процесс, буфер сбрасывается. Срок жизни
+буфера (`GROUP_HOT_TIMEOUT`) ограничивает расхождение с базой, если
+сборка при чтении разминулась с записью.
+
+Буфер в кэше процесса не видит записей других процессов, поэтому
+признаку «в буфере все посты группы» верим только с общим кэшем
+(`CACHE_SHARED`); иначе неполные страницы читаются из базы.
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Comment, Post
+
+LOCK_TIMEOUT = 5
+
+
+def buffer_key(group_id):
+    return f'group_hot:{group_id}'
+
+
+def ids(buffer):
+    return [entry[1] for entry in buffer['entries']]
+
+
+def build(group_id):
+    size = settings.GROUP_HOT_POSTS
+    rows = list(
+        Post.objects.filter(group_id=group_id).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pub_date', 'pk')[:size + 1]
+    )
+    return {
+        'entries': [[pub_date, pk, None] for pub_date, pk in rows[:size]],
+        'complete': len(rows) <= size,
+        'scored': False,
+    }
+
+
+def load(group_id):
+    buffer = cache.get(buffer_key(group_id))
+    if buffer is None:
+        buffer = build(group_id)
+        cache.add(buffer_key(group_id), buffer, settings.GROUP_HOT_TIMEOUT)
+    return buffer
+
+
+def update(group_id, change):
+    """Изменить буфер группы после фиксации транзакции."""
+    transaction.on_commit(lambda: apply(group_id, change))
+
+
+def apply(group_id, change):
+    """Изменить буфер группы, если он есть, под блокировкой."""
+    key = buffer_key(group_id)
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        cache.delete(key)
+        return
+    try:
+        buffer = cache.get(key)
+        if buffer is not None:
+            change(buffer)
+            cache.set(key, buffer, settings.GROUP_HOT_TIMEOUT)
+    finally:
+        cache.delete(lock)
+
+
+def forget(*group_ids):
+    """Сбросить буферы групп; соберутся заново при чтении."""
+    cache.delete_many([buffer_key(group_id) for group_id in group_ids])
+
+
+def weight(moment):
+    return moment.timestamp() * math.log(2) / (
+        settings.GROUP_TRENDING_HALF_LIFE
+    )
+
+
+def add_weight(score, moment):
+    """Логарифм суммы весов с ещё одним комментарием."""
+    value = weight(moment)
+    if score is None:
+        return value
+    high, low = max(score, value), min(score, value)
+    return high + math.log1p(math.exp(low - high))
+
+
+def score(buffer):
+    """Посчитать счета постов буфера по их комментариям."""
+    entries = {entry[1]: entry for entry in buffer['entries']}
+    for entry in entries.values():
+        entry[2] = None
+    comments = Comment.objects.filter(
+        post_id__in=entries
+    ).order_by().values_list('post_id', 'created')
+    for post_id, created in comments.iterator():
+        entry = entries[post_id]
+        entry[2] = add_weight(entry[2], created)
+    buffer['scored'] = True
+
+
+def insert(post):
+    def change(buffer):
+        entries = buffer['entries']
+        if any(entry[1] == post.pk for entry in entries):
+            return
+        entry = [post.pub_date, post.pk, None]
+        position = 0
+        while position < len(entries) and (
+            entries[position][:2] > entry[:2]
+        ):
+            position += 1
+        if position == len(entries) and not buffer['complete']:
+            # Пост старше всего буфера: его покажет запрос к базе.
+            return
+        entries.insert(position, entry)
+        buffer['scored'] = False
+        if len(entries) > settings.GROUP_HOT_POSTS:
+            del entries[settings.GROUP_HOT_POSTS:]
+            buffer['complete'] = False
+
+    update(post.group_id, change)
+
+
+def remove(group_id, post_id):
+    def change(buffer):
+        buffer['entries'] = [
+            entry for entry in buffer['entries'] if entry[1] != post_id
+        ]
+
+    update(group_id, change)
+
+
+def add_comment(group_id, post_id, created):
+    def change(buffer):
+        if not buffer['scored']:
+            return
+        for entry in buffer['entries']:
+            if entry[1] == post_id:
+                entry[2] = add_weight(entry[2], created)
+
+    update(group_id, change)
+
+
+def drop_scores(group_id):
+    def change(buffer):
+        buffer['scored'] = False
+
+    update(group_id, change)
+
+
+def post_saved(post, previous_group_id):
+    if previous_group_id and previous_group_id != post.group_id:
+        remove(previous_group_id, post.pk)
+    if post.group_id and post.group_id != previous_group_id:
+        insert(post)
+
+
+def post_deleted(post):
+    if post.group_id:
+        remove(post.group_id, post.pk)
+
+
+def comment_saved(comment, group_id):
+    if group_id:
+        add_comment(group_id, comment.post_id, comment.created)
+
+
+def comment_deleted(group_id):
+    if group_id:
+        drop_scores(group_id)
+
+
+def latest(group_id):
+    """Аргументы `BufferPaginator` для ленты группы."""
+    buffer = load(group_id)
+    return {
+        'buffer': [
+            {'pub_date': pub_date, 'pk': pk}
+            for pub_date, pk, _ in buffer['entries']
+        ],
+        'complete': buffer['complete'] and settings.CACHE_SHARED,
+    }
+
+
+def trending(group_id):
+    """Id постов буфера от самых обсуждаемых; без комментариев — в конце."""
+    buffer = load(group_id)
+    if not buffer['scored']:
+        score(buffer)
+
+        def change(cached):
+            # Сохраняем счета, только если буфер тем временем не менялся.
+            if ids(cached) == ids(buffer):
+                cached.update(entries=buffer['entries'], scored=True)
+
+        update(group_id, change)
+    ranked = sorted(
+        buffer['entries'],
+        key=lambda entry: (entry[2] is not None, entry[2] or 0, entry[:2]),
+        reverse=True,
+    )
+    return [pk for _, pk, _ in ranked]
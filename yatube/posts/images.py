@@ -0,0 +1,107 @@
+"""Обработка картинок, загружаемых к постам.
+
+Загрузки больше `FILE_UPLOAD_MAX_MEMORY_SIZE` Django пишет на диск
+частями, так что в памяти файл целиком не оказывается. Размеры
+картинки проверяются по заголовку, до декодирования пикселей; JPEG
+сразу декодируется в уменьшенном масштабе (`draft`). Затем картинка
+поворачивается по EXIF, уменьшается до `POST_IMAGE_MAX_SIDE` и
+пережимается без метаданных: JPEG, PNG для картинок с прозрачностью
+или WebP, если он включён и поддерживается Pillow.
+
+Имя файла — хэш пережатых байтов, поэтому одинаковые загрузки
+хранятся одним файлом: если такой файл уже есть, пост просто
+ссылается на него.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .models import Post
+
+FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def check(image, size):
+    if size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ',
+            params={'limit': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    if image.format not in FORMATS:
+        raise ValidationError('Поддерживаются JPEG, PNG, GIF и WebP')
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)d мегапикселей',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def output_format(image):
+    if settings.POST_IMAGE_WEBP and features.check('webp'):
+        return 'WEBP'
+    return 'PNG' if has_alpha(image) else 'JPEG'
+
+
+def save_options(format):
+    if format == 'JPEG':
+        return {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if format == 'WEBP':
+        return {'quality': settings.POST_IMAGE_QUALITY, 'method': 4}
+    return {'optimize': True}
+
+
+def encode(file):
+    """Пережатая картинка и её расширение."""
+    side = settings.POST_IMAGE_MAX_SIDE
+    file.seek(0)
+    try:
+        image = Image.open(file)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Файл не похож на картинку')
+    with image:
+        check(image, file.size)
+        format = output_format(image)
+        mode = 'RGBA' if has_alpha(image) else 'RGB'
+        image.draft(mode, (side, side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side), Image.LANCZOS)
+        image = image.convert(mode)
+        if format == 'JPEG':
+            image = image.convert('RGB')
+        # exif_transpose и convert переносят info['exif'], а PNG и WebP
+        # записывают его в файл.
+        image.info = {}
+        output = BytesIO()
+        image.save(output, format, **save_options(format))
+    return output.getvalue(), EXTENSIONS[format]
+
+
+def process(file):
+    """Значение для `Post.image`: новый файл или имя такого же.
+
+    Имя уже сохранённого файла ставится в поле как есть, и Django не
+    записывает его повторно.
+    """
+    data, extension = encode(file)
+    name = f'{hashlib.sha256(data).hexdigest()}.{extension}'
+    stored = Post._meta.get_field('image').generate_filename(None, name)
+    if default_storage.exists(stored):
+        return stored
+    return ContentFile(data, name=name)
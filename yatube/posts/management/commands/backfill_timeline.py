@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пользователи, чьи ленты пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        demoted = timeline.demote_pending()
+        if demoted:
+            self.stdout.write(f'Разложены посты бывших «звёзд»: {demoted}')
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        count = 0
+        for user in users.iterator():
+            timeline.rebuild(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {count}'
+        ))
@@ -0,0 +1,145 @@
+import json
+import shutil
+import tempfile
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core import profiling
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет временную базу и замеряет задержки, запросы к БД и RPS '
+        'страниц и форм posts под WSGI и ASGI; отчёт выводится в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя'
+        )
+        parser.add_argument('--images', type=int, default=10)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов к каждой странице'
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Потоков сервера, выполняющих запросы'
+        )
+        parser.add_argument(
+            '--server', nargs='+', choices=benchmark.SERVERS,
+            default=['wsgi'],
+            help='Режимы сервера; с несколькими отчёт позволяет их сравнить'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=64,
+            help='Одновременных клиентов ASGI-сервера'
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=0,
+            help='Сколько миллисекунд клиент получает ответ'
+        )
+        parser.add_argument('--sessions', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=benchmark.ENDPOINTS,
+            default=benchmark.ENDPOINTS,
+        )
+        parser.add_argument('--output', help='Файл для отчёта')
+        parser.add_argument(
+            '--profile-templates', action='store_true',
+            help='Добавить в отчёт время отрисовки шаблонов и миниатюр'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Прогон поддерживает только SQLite')
+        directory = tempfile.mkdtemp(prefix='yatube-benchmark-')
+        connection.settings_dict['TEST']['NAME'] = f'{directory}/db.sqlite3'
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                DEBUG=False,
+                MEDIA_ROOT=f'{directory}/media',
+                SEARCH_INDEX_PATH=f'{directory}/search_index',
+            ), ExitStack() as stack:
+                if options['profile_templates']:
+                    stack.enter_context(profiling.profiling())
+                report = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+        report = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+    def benchmark(self, options):
+        cache.clear()
+        benchmark.seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            random_seed=options['seed'],
+        )
+        calls = benchmark.plan(
+            options['endpoints'],
+            requests=options['warmup'] + options['requests'],
+            sessions=options['sessions'],
+            random_seed=options['seed'],
+        )
+        servers = {}
+        for server in options['server']:
+            servers[server] = self.run_server(server, calls, options)
+        return {
+            'config': {
+                name: options[name] for name in (
+                    'users', 'posts', 'groups', 'comments', 'follows',
+                    'images', 'requests', 'warmup', 'concurrency',
+                    'clients', 'client_delay', 'sessions', 'seed',
+                )
+            },
+            'servers': servers,
+        }
+
+    def run_server(self, server, calls, options):
+        delay = options['client_delay'] / 1000
+
+        def run(endpoint_calls):
+            if server == 'asgi':
+                return benchmark.run_asgi(
+                    endpoint_calls, options['concurrency'],
+                    clients=options['clients'], delay=delay,
+                )
+            return benchmark.run(
+                endpoint_calls, options['concurrency'], delay=delay
+            )
+
+        endpoints = {}
+        for endpoint, endpoint_calls in calls.items():
+            run(endpoint_calls[:options['warmup']])
+            profiling.reset()
+            results, seconds = run(endpoint_calls[options['warmup']:])
+            endpoints[endpoint] = benchmark.summary(results, seconds)
+            if profiling.enabled():
+                endpoints[endpoint]['templates'] = profiling.report()
+            self.stderr.write(f'{server} {endpoint}: {endpoints[endpoint]}')
+        return endpoints
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии или подписки в NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.COLUMNS)
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки (по умолчанию stdout)'
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rows = transfer.export_rows(options['kind'], options['batch_size'])
+        if options['path'] == '-':
+            count = transfer.write(
+                rows, self.stdout, options['format'], options['kind']
+            )
+        else:
+            with open(options['path'], 'w', newline='') as stream:
+                count = transfer.write(
+                    rows, stream, options['format'], options['kind']
+                )
+        self.stderr.write(f'Выгружено строк: {count}')
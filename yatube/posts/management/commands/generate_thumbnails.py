@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+UPLOAD_DIR = 'posts'
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для уже загруженных картинок постов'
+
+    def image_names(self):
+        root = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                yield os.path.relpath(
+                    os.path.join(directory, file_name), settings.MEDIA_ROOT
+                ).replace(os.sep, '/')
+
+    def handle(self, *args, **options):
+        results = thumbnails.generate_many(self.image_names())
+        count = sum(1 for urls in results if urls)
+        self.stdout.write(self.style.SUCCESS(
+            f'Подготовлено картинок: {count}'
+        ))
@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает группы, посты, комментарии или подписки из NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.COLUMNS)
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для загрузки (по умолчанию stdin)'
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать пользователей, которых нет в базе'
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе'
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            options['kind'],
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+        try:
+            if options['path'] == '-':
+                count = importer.load(
+                    transfer.read(sys.stdin, options['format'])
+                )
+            else:
+                with open(options['path'], newline='') as stream:
+                    count = importer.load(
+                        transfer.read(stream, options['format'])
+                    )
+        except (transfer.TransferError, IntegrityError, KeyError,
+                ValueError) as error:
+            raise CommandError(f'Загрузка прервана: {error!r}')
+        self.stdout.write(self.style.SUCCESS(f'Загружено строк: {count}'))
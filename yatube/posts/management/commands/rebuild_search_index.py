@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from yatube import db
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        count = 0
+        with db.write():
+            backend.clear()
+            for pk, text in Post.objects.values_list('pk', 'text').iterator():
+                backend.index(pk, text)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {count}'
+        ))
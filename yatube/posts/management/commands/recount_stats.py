@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from yatube import db
+from posts.models import AuthorStats
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок авторов'
+
+    def handle(self, *args, **options):
+        count = 0
+        with db.write():
+            AuthorStats.objects.all().delete()
+            batch = []
+            for values in stats.counted_users().iterator():
+                batch.append(AuthorStats(user_id=values.pop('pk'), **values))
+                if len(batch) == BATCH_SIZE:
+                    AuthorStats.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            AuthorStats.objects.bulk_create(batch)
+            count += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано авторов: {count}'
+        ))
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+TABLE = 'posts_post_fts'
+
+
+# Миграция создаёт только таблицу: код стеммера в posts.search может
+# меняться, а миграция — нет. Уже опубликованные посты индексирует
+# команда rebuild_search_index.
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {TABLE} USING fts5(body)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_comment_follow_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
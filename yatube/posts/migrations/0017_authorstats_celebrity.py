@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS
+    ).update(celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Читается при запросе'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,21 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+    'group__title',
+)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -13,6 +26,21 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author', 'group')
+
+    def with_comment_count(self):
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(count=Count('pk')).values('count')
+        return self.annotate(comment_count=Coalesce(Subquery(comments), 0))
+
+    def for_feed(self):
+        """Посты для лент: авторы и группы одним запросом."""
+        return self.with_related().with_comment_count().only(*FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -43,10 +71,21 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -82,6 +121,11 @@ class Comment(models.Model):
         ordering = ['created']
         verbose_name = 'Коммент'
         verbose_name_plural = 'Комменты'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -104,3 +148,63 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', 'author']),
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Посты автора не раскладываются по лентам, а читаются при запросе
+    # (см. posts/timeline.py).
+    celebrity = models.BooleanField('Читается при запросе', default=False)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
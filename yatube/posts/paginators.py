@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(moment, pk):
+    return f'{(moment - EPOCH) // MICROSECOND}_{pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        micro, pk = cursor.split('_')
+        return EPOCH + int(micro) * MICROSECOND, int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def page_number(number):
+    try:
+        return max(int(number), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу `(дата, id)` без COUNT и OFFSET.
+
+    Страница после курсора выбирается условием по индексу, поэтому
+    дальние страницы стоят столько же, сколько первая. Номер страницы
+    (`?page=N`) по-прежнему поддерживается для старых ссылок, но без
+    подсчёта общего числа записей.
+
+    Без `keys` список считается уже упорядоченным (например, по
+    релевантности) и листается только по номеру страницы.
+
+    Строками могут быть и словари из `values()`: тогда ключи берутся
+    по именам из `keys`.
+
+    Если задан `load`, страница строится по строкам `object_list`
+    (например, записям ленты), а затем `load` превращает их в объекты
+    для вывода.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk'),
+                 descending=True, load=None):
+        self.keys = keys
+        self.descending = descending
+        self.load = load
+        super().__init__(object_list, per_page)
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def ordering(self, reverse=False):
+        prefix = '-' if self.descending != reverse else ''
+        return [prefix + key for key in self.keys]
+
+    def key_of(self, item):
+        if isinstance(item, dict):
+            return [item[key] for key in self.keys]
+        return [getattr(item, key) for key in self.keys]
+
+    def beyond(self, cursor, reverse=False):
+        """Условие «строго после курсора» в порядке выдачи."""
+        moment, pk = cursor
+        date_key, pk_key = self.keys
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        return (
+            Q(**{f'{date_key}__{lookup}e': moment})
+            & (
+                Q(**{f'{date_key}__{lookup}': moment})
+                | Q(**{f'{pk_key}__{lookup}': pk})
+            )
+        )
+
+    def rows_after(self, cursor, limit):
+        return list(self.object_list.filter(
+            self.beyond(cursor)
+        ).order_by(*self.ordering())[:limit])
+
+    def rows_before(self, cursor, limit):
+        """Строки перед курсором, от ближайшей к дальней."""
+        return list(self.object_list.filter(
+            self.beyond(cursor, reverse=True)
+        ).order_by(*self.ordering(reverse=True))[:limit])
+
+    def rows_from(self, bottom, limit):
+        ordered = self.object_list
+        if self.keys:
+            ordered = ordered.order_by(*self.ordering())
+        return list(ordered[bottom:bottom + limit])
+
+    def get_page(self, number=None, after=None, before=None):
+        after, before = decode_cursor(after), decode_cursor(before)
+        if not self.keys:
+            after = before = None
+        limit = self.per_page + 1
+        if after:
+            rows = self.rows_after(after, limit)
+            has_previous, has_next = True, len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            number = 2
+        elif before:
+            rows = self.rows_before(before, limit)
+            has_previous, has_next = len(rows) > self.per_page, True
+            rows = rows[:self.per_page][::-1]
+            number = 1 + has_previous
+        else:
+            number = page_number(number)
+            bottom = (number - 1) * self.per_page
+            rows = self.rows_from(bottom, limit)
+            if not rows and number > 1:
+                return self.get_page()
+            has_previous, has_next = number > 1, len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        self._num_pages = number + has_next
+        page = self._get_page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if rows and self.keys:
+            page.previous_cursor = encode_cursor(*self.key_of(rows[0]))
+            page.next_cursor = encode_cursor(*self.key_of(rows[-1]))
+        if self.load:
+            page.object_list = self.load(rows)
+        return page
+
+    def _check_object_list_is_ordered(self):
+        """Порядок задаётся самим пагинатором."""
+
+
+class BufferPaginator(CursorPaginator):
+    """Страницы из готового списка последних строк ленты.
+
+    `buffer` — словари с ключами `keys`, упорядоченные так же, как
+    страницы, и совпадающие с началом `object_list`. Если `complete`,
+    в буфере вся лента. Страница, которая выходит за конец неполного
+    буфера, выбирается из `object_list` как обычно.
+    """
+
+    def __init__(self, object_list, per_page, buffer=(), complete=False,
+                 **options):
+        super().__init__(object_list, per_page, **options)
+        self.buffer = list(buffer)
+        self.complete = complete
+        # Ключи по возрастанию для поиска курсора делением пополам.
+        self.ascending = [tuple(self.key_of(row)) for row in self.buffer]
+        if self.descending:
+            self.ascending.reverse()
+
+    def served(self, rows, limit, covered=False):
+        return rows if covered or len(rows) == limit or self.complete else None
+
+    def rows_after(self, cursor, limit):
+        if self.descending:
+            start = len(self.buffer) - bisect_left(self.ascending, cursor)
+        else:
+            start = bisect_right(self.ascending, cursor)
+        rows = self.served(self.buffer[start:start + limit], limit)
+        if rows is None:
+            return super().rows_after(cursor, limit)
+        return rows
+
+    def rows_before(self, cursor, limit):
+        if self.descending:
+            end = len(self.buffer) - bisect_right(self.ascending, cursor)
+        else:
+            end = bisect_left(self.ascending, cursor)
+        # Всё, что ближе к началу ленты, чем курсор внутри буфера,
+        # в буфере есть.
+        rows = self.served(
+            self.buffer[max(end - limit, 0):end][::-1], limit,
+            covered=end < len(self.buffer),
+        )
+        if rows is None:
+            return super().rows_before(cursor, limit)
+        return rows
+
+    def rows_from(self, bottom, limit):
+        rows = self.served(self.buffer[bottom:bottom + limit], limit)
+        if rows is None:
+            return super().rows_from(bottom, limit)
+        return rows
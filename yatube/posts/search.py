@@ -0,0 +1,274 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста разбивается на слова, русские слова приводятся к основе
+стеммером Snowball, и основы попадают в обратный индекс. Индекс
+обновляется сигналами при сохранении и удалении постов.
+
+Бэкенд выбирается настройкой `SEARCH_BACKEND`: таблица SQLite FTS5
+с ранжированием bm25 или собственный индекс на диске (`shelve`) с тем
+же ранжированием на Python.
+"""
+import fcntl
+import math
+import re
+import shelve
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+WORD = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+
+
+def endings(*groups):
+    """Окончания по убыванию длины; флаг — нужна ли перед ним «а»/«я»."""
+    return sorted(
+        ((ending, needs_a) for needs_a, words in groups for ending in words),
+        key=lambda item: -len(item[0])
+    )
+
+
+PERFECTIVE_GERUND = endings(
+    (True, ('в', 'вши', 'вшись')),
+    (False, ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')),
+)
+ADJECTIVE = endings((False, (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)))
+PARTICIPLE = endings(
+    (True, ('ем', 'нн', 'вш', 'ющ', 'щ')),
+    (False, ('ивш', 'ывш', 'ующ')),
+)
+REFLEXIVE = endings((False, ('ся', 'сь')))
+VERB = endings(
+    (True, (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    )),
+    (False, (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    )),
+)
+NOUN = endings((False, (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)))
+SUPERLATIVE = endings((False, ('ейш', 'ейше')))
+DERIVATIONAL = endings((False, ('ост', 'ость')))
+
+
+def regions(word):
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def remove(word, start, group):
+    """Срезать самое длинное окончание группы, лежащее после `start`."""
+    for ending, needs_a in group:
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            stem = word[:-len(ending)]
+            if needs_a and not (
+                stem.endswith(('а', 'я')) and len(stem) > start
+            ):
+                return None
+            return stem
+    return None
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = regions(word)
+    result = remove(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = remove(word, rv, REFLEXIVE) or word
+        result = remove(word, rv, ADJECTIVE)
+        if result is not None:
+            result = remove(result, rv, PARTICIPLE) or result
+        else:
+            result = remove(word, rv, VERB)
+            if result is None:
+                result = remove(word, rv, NOUN)
+    word = word if result is None else result
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+    word = remove(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 1 > rv:
+        return word[:-1]
+    result = remove(word, rv, SUPERLATIVE)
+    if result is not None:
+        return result[:-1] if result.endswith('нн') else result
+    if word.endswith('ь') and len(word) > rv:
+        return word[:-1]
+    return word
+
+
+def terms(text):
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+class SQLiteFTSBackend:
+    """Индекс в виртуальной таблице FTS5 с ранжированием bm25."""
+
+    table = 'posts_post_fts'
+
+    def index(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [post_id, ' '.join(terms(text))]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, limit):
+        words = terms(query)
+        if not words:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} '
+                f'MATCH %s ORDER BY rank LIMIT %s',
+                [' '.join(f'{word}*' for word in words), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonIndexBackend:
+    """Обратный индекс в файле `settings.SEARCH_INDEX_PATH`.
+
+    Хранит списки вхождений основ и длины документов, ранжирует
+    результаты по BM25.
+
+    Файл `shelve` не защищён от одновременной записи, поэтому доступ к
+    нему, в том числе при поиске, идёт под блокировкой `flock` файла
+    `SEARCH_INDEX_PATH.lock`. Так индекс можно делить между рабочими
+    процессами одной машины, но не класть на сетевой диск, где `flock`
+    может не работать.
+    """
+
+    lock = threading.Lock()
+    k1 = 1.2
+    b = 0.75
+
+    def open(self, flag='c'):
+        return shelve.open(settings.SEARCH_INDEX_PATH, flag)
+
+    @contextmanager
+    def locked(self):
+        """Блокировка индекса между потоками и процессами."""
+        with self.lock, open(
+            f'{settings.SEARCH_INDEX_PATH}.lock', 'a'
+        ) as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _remove(self, index, post_id):
+        document = index.pop(f'd:{post_id}', None)
+        if document is None:
+            return
+        for term in set(document):
+            postings = index.get(f't:{term}', {})
+            postings.pop(post_id, None)
+            index[f't:{term}'] = postings
+        stats = index.get('stats', (0, 0))
+        index['stats'] = (stats[0] - 1, stats[1] - len(document))
+
+    def index(self, post_id, text):
+        document = terms(text)
+        with self.locked(), self.open() as index:
+            self._remove(index, post_id)
+            for term, count in Counter(document).items():
+                postings = index.get(f't:{term}', {})
+                postings[post_id] = count
+                index[f't:{term}'] = postings
+            index[f'd:{post_id}'] = document
+            stats = index.get('stats', (0, 0))
+            index['stats'] = (stats[0] + 1, stats[1] + len(document))
+
+    def remove(self, post_id):
+        with self.locked(), self.open() as index:
+            self._remove(index, post_id)
+
+    def clear(self):
+        with self.locked(), self.open('n'):
+            pass
+
+    def search(self, query, limit):
+        words = set(terms(query))
+        if not words:
+            return []
+        with self.locked(), self.open() as index:
+            documents, length = index.get('stats', (0, 0))
+            postings = [index.get(f't:{word}', {}) for word in words]
+            if not all(postings):
+                return []
+            found = set.intersection(*(set(posting) for posting in postings))
+            lengths = {
+                post_id: len(index[f'd:{post_id}']) for post_id in found
+            }
+        average = length / documents if documents else 0
+        scores = Counter()
+        for posting in postings:
+            idf = math.log(
+                1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5)
+            )
+            for post_id in found:
+                frequency = posting[post_id]
+                scores[post_id] += idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (
+                        1 - self.b + self.b * lengths[post_id] / average
+                    )
+                )
+        return [post_id for post_id, _ in scores.most_common(limit)]
+
+
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def index_post(post):
+    get_backend().index(post.pk, post.text)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def search(query):
+    """Id постов по убыванию релевантности."""
+    return get_backend().search(query, settings.SEARCH_MAX_RESULTS)
@@ -0,0 +1,113 @@
+import threading
+
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    feed_cache, follows, graph, hot, search, stats, thumbnails, timeline
+)
+from .models import Comment, Follow, Post
+
+# Id постов, которые удаляются в этом потоке. Их комментарии удаляются
+# каскадом раньше самого поста, и ленты сбросит сигнал удаления поста.
+_local = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_local, 'posts'):
+        _local.posts = set()
+    return _local.posts
+
+
+def comment_post(comment):
+    """Пост комментария; без загруженного — только автор и группа."""
+    if Comment._meta.get_field('post').is_cached(comment):
+        return comment.post
+    return Post.objects.only('author', 'group').get(pk=comment.post_id)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = instance._previous_image = None
+    if instance.pk and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.change(instance.author_id, posts_count=1)
+        timeline.fan_out_post(instance)
+    if instance.image and instance.image.name != instance._previous_image:
+        thumbnails.schedule(instance.image.name)
+    hot.post_saved(instance, instance._previous_group_id)
+    search.index_post(instance)
+    feed_cache.bump(*feed_cache.post_scopes(
+        instance, [instance._previous_group_id]
+    ))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+    search.remove_post(instance.pk)
+    hot.post_deleted(instance)
+    stats.change(instance.author_id, posts_count=-1)
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    post = comment_post(instance)
+    if created:
+        stats.change(instance.author_id, comments_count=1)
+        hot.comment_saved(instance, post.group_id)
+    feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, comments_count=-1)
+    if instance.post_id in deleting_posts():
+        return
+    post = comment_post(instance)
+    hot.comment_deleted(post.group_id)
+    feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, followers_count=1)
+        stats.change(instance.user_id, following_count=1)
+        timeline.follower_added(instance.author_id)
+        timeline.add_author(instance.user_id, instance.author_id)
+        graph.changed(instance)
+        follows.forget(instance)
+        feed_cache.bump(f'follow:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, followers_count=-1)
+    stats.change(instance.user_id, following_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.follower_removed(instance.author_id)
+    graph.changed(instance)
+    follows.forget(instance)
+    feed_cache.bump(f'follow:{instance.user_id}')
@@ -0,0 +1,70 @@
+"""Денормализованные счётчики авторов.
+
+Счётчики меняются сигналами в той же транзакции, что и запись поста,
+комментария или подписки, поэтому профиль и страница поста читают
+готовые значения вместо COUNT(*). Расхождения исправляет команда
+`recount_stats`.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'comments_count': (Comment, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def counted(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def counted_users(users=None):
+    users = User.objects.all() if users is None else users
+    return users.annotate(**{
+        name: counted(model, field)
+        for name, (model, field) in COUNTERS.items()
+    }).values('pk', *COUNTERS)
+
+
+def recount(user_id):
+    values = counted_users(User.objects.filter(pk=user_id)).get()
+    values.pop('pk')
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id, defaults=values
+    )
+    return stats
+
+
+def change(user_id, **deltas):
+    """Изменить счётчики пользователя на заданные величины."""
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        name: F(name) + delta for name, delta in deltas.items()
+    })
+    if not updated and min(deltas.values()) > 0:
+        recount(user_id)
+
+
+def for_user(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def followers_count(author_id):
+    try:
+        return AuthorStats.objects.values_list(
+            'followers_count', flat=True
+        ).get(user_id=author_id)
+    except AuthorStats.DoesNotExist:
+        return recount(author_id).followers_count
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import follows
+
+register = template.Library()
+
+
+@register.filter
+def follows_author(user, author):
+    """{% if user|follows_author:post.author %} — без запроса на автора."""
+    return follows.is_following(user, author)
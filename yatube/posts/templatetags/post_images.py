@@ -0,0 +1,16 @@
+from django import template
+
+from core import profiling
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(image, alias='card'):
+    if not image:
+        return ''
+    return thumbnails.url(image.name, alias)
+
+
+profiling.profile_tag(register, 'thumbnail_url', 'thumbnail')
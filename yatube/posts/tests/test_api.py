@@ -0,0 +1,238 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+SESSION_URL = reverse('api:session')
+POSTS_URL = reverse('api:posts')
+POST_BATCH_URL = reverse('api:post_batch')
+GROUPS_URL = reverse('api:groups')
+GROUP_BATCH_URL = reverse('api:group_batch')
+FOLLOWS_URL = reverse('api:follows')
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', password='secret-password'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Раз')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Два')
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+
+
+class ApiReadTests(ApiTestCase):
+    def test_posts_page(self):
+        with self.assertNumQueries(1):
+            data = self.guest.get(POSTS_URL).json()
+        self.assertEqual(
+            [item['text'] for item in data['results']],
+            [post.text for post in reversed(self.posts)],
+        )
+        item = data['results'][0]
+        self.assertEqual(item['author'], 'author')
+        self.assertIsNone(item['image'])
+        self.assertEqual(item['comment_count'], 2)
+
+    def test_cursor_pages(self):
+        first = self.guest.get(POSTS_URL, {'limit': 2}).json()
+        second = self.guest.get(first['next']).json()
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']],
+            [post.pk for post in reversed(self.posts)][:4],
+        )
+        back = self.guest.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_fields(self):
+        data = self.guest.get(POSTS_URL, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.guest.get(POSTS_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters(self):
+        data = self.guest.get(POSTS_URL, {'group': 'group'}).json()
+        self.assertEqual(
+            {item['group'] for item in data['results']}, {'group'}
+        )
+        data = self.guest.get(POSTS_URL, {'author': 'reader'}).json()
+        self.assertEqual(data['results'], [])
+
+    def test_post_batch(self):
+        ids = [self.posts[2].pk, 999, self.posts[0].pk]
+        with self.assertNumQueries(1):
+            data = self.guest.get(
+                POST_BATCH_URL, {'ids': ','.join(map(str, ids))}
+            ).json()
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [self.posts[2].pk, self.posts[0].pk],
+        )
+        for ids in ['1,x', ','.join(['1'] * 101), '1,99999999999999999999']:
+            with self.subTest(ids=ids[:10]):
+                response = self.guest.get(POST_BATCH_URL, {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+
+    def test_detail_and_missing(self):
+        url = reverse('api:post', args=[self.post.pk])
+        self.assertEqual(self.guest.get(url).json()['id'], self.post.pk)
+        response = self.guest.get(reverse('api:post', args=[999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+    def test_comments_oldest_first(self):
+        data = self.guest.get(
+            reverse('api:comments', args=[self.post.pk])
+        ).json()
+        self.assertEqual(
+            [item['text'] for item in data['results']], ['Раз', 'Два']
+        )
+
+    def test_groups(self):
+        data = self.guest.get(GROUPS_URL, {'limit': 1}).json()
+        self.assertEqual(data['results'][0]['slug'], 'group')
+        self.assertEqual(
+            self.guest.get(data['next']).json()['results'][0]['slug'],
+            'other',
+        )
+        data = self.guest.get(GROUP_BATCH_URL, {'slugs': 'other,group'})
+        self.assertEqual(
+            [item['slug'] for item in data.json()['results']],
+            ['other', 'group'],
+        )
+        self.assertEqual(
+            self.guest.get(reverse('api:group', args=['other'])).json(),
+            {'slug': 'other', 'title': 'Другая', 'description': 'Описание'},
+        )
+
+    def test_method_not_allowed(self):
+        response = self.client.put(POST_BATCH_URL)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
+
+
+class ApiWriteTests(ApiTestCase):
+    def test_session_login(self):
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.get(SESSION_URL).json(), {'user': None})
+        response = client.post(
+            SESSION_URL,
+            json.dumps({
+                'username': 'author', 'password': 'secret-password'
+            }),
+            content_type='application/json',
+            HTTP_X_CSRFTOKEN=client.cookies['csrftoken'].value,
+        )
+        self.assertEqual(response.json(), {'user': {'username': 'author'}})
+        response = client.post(
+            POSTS_URL,
+            json.dumps({'text': 'Из приложения'}),
+            content_type='application/json',
+            HTTP_X_CSRFTOKEN=client.cookies['csrftoken'].value,
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_create_post(self):
+        response = self.send(self.guest, 'post', POSTS_URL, {'text': 'Нет'})
+        self.assertEqual(response.status_code, 401)
+        response = self.send(
+            self.client, 'post', POSTS_URL,
+            {'text': 'Новый пост', 'group': 'other'},
+        )
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(
+            (post.text, post.group, post.author),
+            ('Новый пост', self.other_group, self.author),
+        )
+        response = self.send(self.client, 'post', POSTS_URL, {'text': ''})
+        self.assertIn('text', response.json()['errors'])
+        response = self.send(
+            self.client, 'post', POSTS_URL, {'text': ['Список']}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        response = self.send(
+            self.client, 'post', POSTS_URL,
+            {'text': 'Пост', 'group': 'missing'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('group', response.json()['errors'])
+
+    def test_edit_and_delete_post(self):
+        post = self.posts[3]
+        url = reverse('api:post', args=[post.pk])
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertEqual(
+            self.send(reader, 'patch', url, {'text': 'Чужой'}).status_code,
+            403,
+        )
+        data = self.send(
+            self.client, 'patch', url, {'text': 'Исправлено'}
+        ).json()
+        self.assertEqual(
+            (data['text'], data['group']), ('Исправлено', 'group')
+        )
+        response = self.client.patch(
+            url, 'text=Форма',
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.status_code, 415)
+        response = self.send(self.client, 'patch', url, {'group': 'missing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('group', response.json()['errors'])
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_add_comment(self):
+        url = reverse('api:comments', args=[self.post.pk])
+        response = self.send(self.client, 'post', url, {'text': 'Три'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'author')
+        self.assertEqual(self.post.comments.count(), 3)
+
+    def test_follows(self):
+        reader = Client()
+        reader.force_login(self.reader)
+        response = self.send(reader, 'post', FOLLOWS_URL, {'author': 'author'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            reader.get(FOLLOWS_URL).json()['results'], [{'author': 'author'}]
+        )
+        response = self.send(reader, 'post', FOLLOWS_URL, {'author': 'reader'})
+        self.assertEqual(response.status_code, 400)
+        url = reverse('api:follow', args=['author'])
+        self.assertEqual(reader.delete(url).status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.guest.get(FOLLOWS_URL).status_code, 401)
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics, parallel, pool, routers
+from core.asgi import ASGIHandler
+
+
+def http_scope(path, query=b'', headers=(), method='GET'):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+def call(application, scope, body=(b'',)):
+    """Выполнить запрос; тело запроса приходит частями `body`."""
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': True}
+        for chunk in body[:-1]
+    ] + [{'type': 'http.request', 'body': body[-1]}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.environs = []
+
+        def echo(environ, start_response):
+            self.environs.append(environ)
+            start_response('201 Created', [('X-Thread', 'yes')])
+            return [b'body: ', environ['wsgi.input'].read()]
+
+        self.handler = ASGIHandler(echo, workers=2)
+        self.addCleanup(self.handler.close)
+
+    def test_request_translated_to_environ(self):
+        sent = call(self.handler, http_scope(
+            '/путь/', b'q=1',
+            [(b'cookie', b'a=1'), (b'cookie', b'b=2'),
+             (b'content-type', b'text/plain'), (b'x-token', b'abc')],
+            method='POST',
+        ), body=(b'hello, ', b'world'))
+        environ, = self.environs
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/путь/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TOKEN'], 'abc')
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(sent[0]['headers'], [(b'x-thread', b'yes')])
+        self.assertEqual(sent[1]['body'], b'body: hello, world')
+
+    def test_disconnect_skips_application(self):
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            raise AssertionError('Ответ отключившемуся клиенту')
+
+        asyncio.run(self.handler(http_scope('/'), receive, send))
+        self.assertEqual(self.environs, [])
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
+
+    def test_startup_hook(self):
+        """Хук старта выполняется в рабочем потоке до startup.complete."""
+        threads = []
+        handler = ASGIHandler(
+            None, workers=1,
+            startup=lambda: threads.append(threading.current_thread().name),
+        )
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                self.assertEqual(len(threads), 1)
+
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+        self.assertTrue(threads[0].startswith('asgi'))
+
+    def test_django_page(self):
+        handler = ASGIHandler(get_wsgi_application(), workers=1)
+        self.addCleanup(handler.close)
+        start, body = call(
+            handler, http_scope(reverse('about:author'))
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn(b'server-timing', dict(start['headers']))
+        self.assertIn(b'<html', body['body'])
+
+
+class GatherTests(SimpleTestCase):
+    def test_parts_run_in_pool_threads(self):
+        def part():
+            metrics.add('db_queries', 2)
+            return threading.current_thread().name, routers.replica()
+
+        routers.set_replica('replica1')
+        self.addCleanup(routers.release)
+        measurement = metrics.start()
+        self.addCleanup(metrics.stop)
+        first, second = parallel.gather(part, part)
+        self.assertEqual(first, (threading.current_thread().name, 'replica1'))
+        self.assertTrue(second[0].startswith('views'))
+        self.assertEqual(second[1], 'replica1')
+        self.assertEqual(measurement.db_queries, 4)
+
+    def test_part_without_connection_runs_in_request_thread(self):
+        def part():
+            if threading.current_thread().name.startswith('views'):
+                raise pool.Exhausted('Все соединения пула заняты')
+            return threading.current_thread().name
+
+        self.assertEqual(
+            parallel.gather(part, part),
+            [threading.current_thread().name] * 2,
+        )
+
+    @override_settings(VIEW_THREADS=0)
+    def test_without_threads(self):
+        self.assertEqual(
+            parallel.gather(
+                lambda: threading.current_thread().name, lambda: 1
+            ),
+            [threading.current_thread().name, 1],
+        )
+
+
+class GatherInTransactionTests(TestCase):
+    def test_parts_run_in_request_thread(self):
+        name = threading.current_thread().name
+        self.assertEqual(
+            parallel.gather(*[lambda: threading.current_thread().name] * 3),
+            [name] * 3,
+        )
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import benchmark
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class SeedTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_seed(self):
+        benchmark.seed(
+            users=40, posts=200, groups=3, comments=300, follows=6, images=2
+        )
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+
+    def test_follow_graph_is_skewed(self):
+        """Подписчики сосредоточены у немногих авторов."""
+        benchmark.seed(users=60, posts=0, comments=0, follows=8, images=0)
+        followers = sorted(AuthorStats.objects.values_list(
+            'followers_count', flat=True
+        ), reverse=True)
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+
+
+class SummaryTests(TestCase):
+    def test_percentiles(self):
+        results = [
+            benchmark.Result('index', 200, seconds / 1000, 2)
+            for seconds in range(1, 101)
+        ]
+        report = benchmark.summary(results, seconds=2)
+        self.assertEqual(report['requests'], 100)
+        self.assertEqual(report['rps'], 50)
+        self.assertEqual(
+            report['latency_ms'], {'p50': 50, 'p95': 95, 'p99': 99}
+        )
+        self.assertEqual(report['queries'], {'mean': 2, 'max': 2})
+
+    def test_errors(self):
+        results = [
+            benchmark.Result('index', status, 0.01, 1)
+            for status in (200, 302, 404, 500)
+        ]
+        report = benchmark.summary(results, seconds=1)
+        self.assertEqual(report['errors'], 2)
+        self.assertEqual(
+            report['statuses'], {'200': 1, '302': 1, '404': 1, '500': 1}
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class RunTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        benchmark.seed(
+            users=10, posts=30, groups=2, comments=20, follows=3, images=0
+        )
+
+    def test_every_endpoint_answers(self):
+        calls = benchmark.plan(requests=3, sessions=2)
+        for endpoint, endpoint_calls in calls.items():
+            with self.subTest(endpoint=endpoint):
+                results, seconds = benchmark.run(
+                    endpoint_calls, concurrency=1
+                )
+                report = benchmark.summary(results, seconds)
+                self.assertEqual(report['errors'], 0, report)
+                self.assertEqual(report['requests'], len(endpoint_calls))
+
+    def test_writes_go_through_csrf(self):
+        calls = benchmark.plan(['post_create'], requests=2, sessions=1)
+        before = Post.objects.count()
+        results, _ = benchmark.run(calls['post_create'], concurrency=1)
+        self.assertEqual([result.status for result in results], [302, 302])
+        self.assertEqual(Post.objects.count(), before + 2)
+
+    def test_asgi_server_answers(self):
+        calls = benchmark.plan(
+            ['index', 'profile', 'post_create'], requests=3, sessions=2
+        )
+        for endpoint, endpoint_calls in calls.items():
+            with self.subTest(endpoint=endpoint):
+                results, seconds = benchmark.run_asgi(
+                    endpoint_calls, concurrency=1, clients=2
+                )
+                report = benchmark.summary(results, seconds)
+                self.assertEqual(report['errors'], 0, report)
+                self.assertEqual(report['requests'], len(endpoint_calls))
+                self.assertGreater(report['queries']['mean'], 0)
@@ -1,20 +1,105 @@
-from django.test import TestCase, Client
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Post, User
+from .. import feed_cache
+from ..models import Comment, Group, Post, User
 
+INDEX_URL = reverse('posts:index')
+GROUP_SLUG = 'test-slug'
+GROUP_URL = reverse('posts:group_list', args=[GROUP_SLUG])
 
-class TaskURLTests(TestCase):
 
-    def test_cache_index_page(self):
-        super().setUpClass()
-        no_user_name = 'noUserName'
-        user = User.objects.create_user(username=no_user_name)
-        post = Post.objects.create(
-            author=user,
+class TaskURLTests(TransactionTestCase):
+    """Версии лент меняются после фиксации, поэтому без общей транзакции."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='noUserName')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Описание',
+        )
+        self.post = Post.objects.create(
+            author=self.user,
             text='Тестовый пост',
         )
-        content = Client().get(reverse('posts:index')).content
-        Post.objects.filter(id=post.id).delete()
-        content_cache = Client().get(reverse('posts:index')).content
+
+    def test_cache_index_page(self):
+        content = Client().get(INDEX_URL).content
+        Post.objects.filter(id=self.post.id).update(text='Без сигналов')
+        content_cache = Client().get(INDEX_URL).content
         self.assertEqual(content, content_cache, 'Не работает cache страницы')
+
+    def test_cache_invalidated_on_delete(self):
+        """Удаление поста сбрасывает кэш ленты."""
+        content = Client().get(INDEX_URL).content
+        Post.objects.filter(id=self.post.id).delete()
+        self.assertNotEqual(content, Client().get(INDEX_URL).content)
+
+    def test_cache_keyed_on_page(self):
+        """Разные страницы ленты кэшируются отдельно."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(15)
+        )
+        response = Client().get(INDEX_URL)
+        self.assertNotContains(response, self.post.text)
+        self.assertContains(
+            Client().get(
+                INDEX_URL, {'after': response.context['page_obj'].next_cursor}
+            ),
+            self.post.text,
+        )
+
+    def test_group_cache_invalidated_on_move(self):
+        """Перенос поста в группу сбрасывает кэш страницы группы."""
+        content = Client().get(GROUP_URL).content
+        self.post.group = self.group
+        self.post.save()
+        self.assertNotEqual(content, Client().get(GROUP_URL).content)
+
+    @override_settings(FEED_VERSION_TIMEOUT=30)
+    def test_versions_expire_without_shared_cache(self):
+        """Версия ленты в кэше процесса живёт FEED_VERSION_TIMEOUT секунд."""
+        version = feed_cache.versions('index')
+        self.assertEqual(feed_cache.versions('index'), version)
+        with mock.patch('time.time', return_value=time.time() + 31):
+            self.assertNotEqual(feed_cache.versions('index'), version)
+
+    def test_comment_delete_invalidates_post_feeds(self):
+        """Удаление комментария сбрасывает кэш лент его поста."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        content = Client().get(INDEX_URL).content
+        Comment.objects.get(pk=comment.pk).delete()
+        self.assertNotEqual(content, Client().get(INDEX_URL).content)
+
+    def test_post_delete_skips_comment_post_loads(self):
+        """Каскадное удаление комментариев не читает пост на каждый."""
+        for number in range(5):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Ком {number}'
+            )
+        post = Post.objects.get(pk=self.post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT "posts_post"')
+            for query in queries.captured_queries
+        ))
+
+    def test_bump_waits_for_commit(self):
+        """Версия ленты меняется только после фиксации транзакции."""
+        version = feed_cache.versions('index')
+        with transaction.atomic():
+            feed_cache.bump('index')
+            self.assertEqual(feed_cache.versions('index'), version)
+        self.assertNotEqual(feed_cache.versions('index'), version)
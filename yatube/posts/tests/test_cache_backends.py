@@ -0,0 +1,232 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.backends.redis import RedisCache
+from core.backends import tiered
+from core.backends.tiered import TieredCache
+from core.resp_server import RespServer
+from posts.models import Post, User
+
+INDEX_URL = reverse('posts:index')
+
+
+class RespServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RespServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.store.data.clear()
+        tiered._lrus.clear()
+
+    def shared(self, **options):
+        return {
+            'BACKEND': 'core.backends.redis.RedisCache',
+            'LOCATION': self.server.url,
+            **options,
+        }
+
+    def tiered(self, name='test', **options):
+        return TieredCache(name, {
+            'OPTIONS': {'SHARED': self.shared(), **options},
+        })
+
+
+class RedisCacheTests(RespServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RedisCache(self.server.url, {})
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_expiry(self):
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('forever', 1, timeout=None)
+        self.cache.set('gone', 1, timeout=0)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.has_key('forever'))
+        self.assertFalse(self.cache.has_key('gone'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 4), 5)
+        self.assertEqual(self.cache.get('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_shared_between_instances(self):
+        """Экземпляры разных процессов видят одни данные."""
+        RedisCache(self.server.url, {}).set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_reconnects(self):
+        self.cache.set('key', 'value')
+        self.cache.connection.sock.close()
+        self.assertEqual(self.cache.get('key'), 'value')
+
+
+class TieredCacheTests(RespServerMixin, TestCase):
+    def test_local_hit_skips_shared(self):
+        tiered = self.tiered()
+        tiered.set('key', 'value')
+        commands = self.server.store.commands
+        self.assertEqual(tiered.get('key'), 'value')
+        self.assertEqual(self.server.store.commands, commands)
+
+    def test_other_process_sees_write(self):
+        first = self.tiered(name='first', LOCAL_TIMEOUT=0.05)
+        second = self.tiered(name='second', LOCAL_TIMEOUT=0.05)
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'old')
+        time.sleep(0.1)
+        self.assertEqual(second.get('key'), 'new')
+
+    def test_get_many_and_delete(self):
+        tiered = self.tiered()
+        tiered.set_many({'a': 1, 'b': 2})
+        self.assertEqual(tiered.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        tiered.delete('a')
+        self.assertEqual(tiered.get_many(['a', 'b']), {'b': 2})
+
+    def test_early_recompute(self):
+        """Незадолго до истечения отдельный читатель получает промах."""
+        tiered = self.tiered(BETA=1.0)
+        tiered.misses[tiered.key('fragment')] = time.monotonic() - 1
+        tiered.set('fragment', 'html', timeout=2)
+        with mock.patch('random.random', return_value=0.0):
+            self.assertEqual(tiered.get('fragment'), 'html')
+        with mock.patch('random.random', return_value=0.9):
+            self.assertIsNone(tiered.get('fragment'))
+
+    def test_get_or_set_single_flight(self):
+        tiered_caches = [self.tiered(name=f'worker-{n}') for n in range(5)]
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda tiered=tiered: results.append(
+                tiered.get_or_set('popular', compute, timeout=60)
+            ))
+            for tiered in tiered_caches
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_get_or_set_keeps_foreign_lock(self):
+        tiered = self.tiered(LOCK_TIMEOUT=0.1)
+        lock = f'{tiered.key("popular")}:lock'
+        tiered.shared.add(lock, 1, 60)
+        self.assertEqual(tiered.get_or_set('popular', 'value'), 'value')
+        self.assertTrue(tiered.shared.has_key(lock))
+
+
+class TieredCacheDownTests(TestCase):
+    """Общий кэш недоступен: работает только L1."""
+
+    SHARED = {
+        'BACKEND': 'core.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:1/0',
+        'OPTIONS': {'SOCKET_TIMEOUT': 1},
+    }
+
+    def setUp(self):
+        tiered._lrus.clear()
+        tiered._down_until.clear()
+        self.addCleanup(tiered._down_until.clear)
+        self.cache = TieredCache('down', {'OPTIONS': {'SHARED': self.SHARED}})
+        warning = mock.patch.object(tiered.logger, 'warning')
+        self.warning = warning.start()
+        self.addCleanup(warning.stop)
+
+    def test_errors_are_misses_and_l1_serves(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_many(['key', 'other']), {
+            'key': 'value'
+        })
+        self.assertTrue(self.cache.add('new', 1))
+        self.assertFalse(self.cache.add('new', 2))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get_or_set('computed', lambda: 5), 5)
+        self.warning.assert_called_once()
+
+    def test_shared_skipped_while_down(self):
+        self.cache.get('key')
+        with mock.patch.object(
+            self.cache.shared.connection, 'connect'
+        ) as connect:
+            self.cache.get('key')
+            self.cache.set('key', 'value')
+        connect.assert_not_called()
+
+    def test_pages_served(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'core.backends.tiered.TieredCache',
+            'LOCATION': 'down',
+            'OPTIONS': {'SHARED': self.SHARED},
+        }}):
+            for _ in range(2):
+                self.assertEqual(Client().get(INDEX_URL).status_code, 200)
+            cache.clear()
+
+
+class TieredSiteTests(RespServerMixin, TransactionTestCase):
+    def test_pages_served_through_tiered_cache(self):
+        caches = {'default': {
+            'BACKEND': 'core.backends.tiered.TieredCache',
+            'LOCATION': 'site',
+            'OPTIONS': {'SHARED': self.shared()},
+        }}
+        with override_settings(CACHES=caches):
+            post = Post.objects.create(
+                author=User.objects.create_user(username='author'),
+                text='Тестовый пост',
+            )
+            content = Client().get(INDEX_URL).content
+            Post.objects.filter(pk=post.pk).update(text='Без сигналов')
+            self.assertEqual(Client().get(INDEX_URL).content, content)
+            post.delete()
+            self.assertNotContains(Client().get(INDEX_URL), 'Тестовый пост')
+            cache.clear()
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+INDEX_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=['group'])
+PROFILE_URL = reverse('posts:profile', args=['author'])
+
+
+class ConditionalGetTests(TransactionTestCase):
+    """Версии лент меняются после фиксации, поэтому без общей транзакции."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Тестовый пост'
+        )
+        self.POST_URL = reverse('posts:post_detail', args=[self.post.pk])
+        cache.clear()
+        self.guest = Client()
+
+    def revalidate(self, url, client=None, **params):
+        client = client or self.guest
+        etag = client.get(url, params)['ETag']
+        return client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_queries(self):
+        etag = self.guest.get(INDEX_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.guest.get(INDEX_URL)['Last-Modified']
+        response = self.guest.get(
+            INDEX_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_revalidate(self):
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL, self.POST_URL):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_changes_invalidate(self):
+        changes = [
+            (INDEX_URL, lambda: Post.objects.create(
+                author=self.reader, text='Новый пост'
+            )),
+            (GROUP_URL, lambda: Post.objects.create(
+                author=self.reader, group=self.group, text='Новый пост'
+            )),
+            (PROFILE_URL, lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+            (self.POST_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )),
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.guest.get(url)['ETag']
+                change()
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_page_and_user(self):
+        user = Client()
+        user.force_login(self.reader)
+        response = user.get(INDEX_URL)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etags = {
+            self.guest.get(INDEX_URL)['ETag'],
+            self.guest.get(INDEX_URL, {'page': 2})['ETag'],
+            response['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_follow_index(self):
+        user = Client()
+        user.force_login(self.reader)
+        self.assertEqual(
+            self.revalidate(reverse('posts:follow_index'), user).status_code,
+            304,
+        )
+
+    def test_unknown_group(self):
+        response = self.guest.get(reverse('posts:group_list', args=['no']))
+        self.assertEqual(response.status_code, 404)
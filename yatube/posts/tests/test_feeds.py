@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+INDEX_RSS_URL = reverse('posts:index_rss')
+INDEX_ATOM_URL = reverse('posts:index_atom')
+GROUP_RSS_URL = reverse('posts:group_rss', args=['group'])
+AUTHOR_ATOM_URL = reverse('posts:author_atom', args=['author'])
+
+
+class FeedTests(TransactionTestCase):
+    """Версии лент меняются после фиксации, поэтому без общей транзакции."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост в группе'
+        )
+        Post.objects.create(author=self.other, text='Пост без группы')
+        cache.clear()
+        self.guest = Client()
+
+    def test_feeds_list_their_posts(self):
+        cases = [
+            (INDEX_RSS_URL, 'application/rss+xml',
+             ['Пост в группе', 'Пост без группы'], []),
+            (INDEX_ATOM_URL, 'application/atom+xml',
+             ['Пост в группе', 'Пост без группы'], []),
+            (GROUP_RSS_URL, 'application/rss+xml',
+             ['Пост в группе', 'Описание группы'], ['Пост без группы']),
+            (AUTHOR_ATOM_URL, 'application/atom+xml',
+             ['Пост в группе'], ['Пост без группы']),
+        ]
+        for url, content_type, present, absent in cases:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type)
+                )
+                for text in present:
+                    self.assertContains(response, text)
+                for text in absent:
+                    self.assertNotContains(response, text)
+
+    def test_cached_until_post_saved(self):
+        self.guest.get(INDEX_RSS_URL)
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_RSS_URL)
+        self.assertContains(response, 'Пост в группе')
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.guest.get(INDEX_RSS_URL), 'Свежий пост')
+
+    def test_conditional_get(self):
+        response = self.guest.get(GROUP_RSS_URL)
+        for header, value in [
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.guest.get(GROUP_RSS_URL, **{header: value})
+                    .status_code,
+                    304,
+                )
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.guest.get(
+            GROUP_RSS_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_unknown_scope(self):
+        for url in [
+            reverse('posts:group_atom', args=['missing']),
+            reverse('posts:author_rss', args=['missing']),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest.get(url).status_code, 404)
+
+    def test_pages_link_feeds(self):
+        self.assertContains(
+            self.guest.get(reverse('posts:index')), INDEX_RSS_URL
+        )
@@ -1,6 +1,9 @@
+from django.core.cache import cache
 from django.shortcuts import reverse
-from django.test import Client, TestCase
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase
 
+from posts import follows
 from posts.models import Follow, Group, Post, User
 
 SLUG = 'test-slug'
@@ -83,3 +86,76 @@ class PagesTests(TestCase):
                 author=self.post.author.id
             ).exists()
         )
+
+
+class FollowedIdsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username=USERNAME)
+        self.authors = [
+            User.objects.create(username=f'{AUTHOR_USERNAME}{number}')
+            for number in range(3)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=self.user, author=author)
+            for author in self.authors[:2]
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def viewer(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_one_query_per_request(self):
+        viewer = self.viewer()
+        with self.assertNumQueries(1):
+            checked = [
+                follows.is_following(viewer, author)
+                for author in self.authors
+            ]
+        self.assertEqual(checked, [True, True, False])
+
+    def test_cached_between_requests(self):
+        follows.followed_ids(self.viewer())
+        viewer = self.viewer()
+        with self.assertNumQueries(0):
+            self.assertIn(self.authors[0].pk, follows.followed_ids(viewer))
+
+    def test_follow_and_unfollow_invalidate(self):
+        third = self.authors[2]
+        follows.followed_ids(self.viewer())
+        self.client.get(
+            reverse('posts:profile_follow', args=[third.username])
+        )
+        self.assertTrue(follows.is_following(self.viewer(), third))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[third.username])
+        )
+        self.assertFalse(follows.is_following(self.viewer(), third))
+
+    def test_memo_dropped_for_same_user_object(self):
+        viewer = self.viewer()
+        follows.followed_ids(viewer)
+        Follow.objects.create(user=viewer, author=self.authors[2])
+        self.assertTrue(follows.is_following(viewer, self.authors[2]))
+
+    def test_anonymous_follows_nobody(self):
+        response = self.client_class().get(
+            reverse('posts:profile', args=[self.authors[0].username])
+        )
+        self.assertFalse(response.context['following'])
+
+    def test_template_filter(self):
+        template = Template(
+            '{% load follow_status %}'
+            '{% for author in authors %}'
+            '{% if user|follows_author:author %}+{% else %}-{% endif %}'
+            '{% endfor %}'
+        )
+        viewer = self.viewer()
+        with self.assertNumQueries(1):
+            rendered = template.render(Context({
+                'user': viewer,
+                'authors': self.authors + [self.authors[0].pk],
+            }))
+        self.assertEqual(rendered, '++-+')
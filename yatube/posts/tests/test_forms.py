@@ -88,8 +88,7 @@ class PostFormTests(TestCase):
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(
-            post.image.name, 'posts/' + form_data['image'].name)
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{64}\.jpg$')
 
     def test_change_post(self):
         """Валидная форма создает запись в Post."""
@@ -144,7 +143,7 @@ class PostFormTests(TestCase):
             follow=True
         )
         self.assertRedirects(response, self.POST_URL)
-        comment = response.context['comments'].first()
+        comment = response.context['comments'][0]
         self.assertEqual(
             comment.text, form_data['text'])
         self.assertEqual(
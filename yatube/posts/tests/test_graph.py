@@ -0,0 +1,136 @@
+from array import array
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from yatube import db
+
+from posts import feed_cache, graph
+from posts.models import Follow, User
+
+# Кто на кого подписан: номер пользователя -> номера авторов.
+EDGES = {
+    0: [1, 2, 3],
+    1: [0, 2, 4],
+    2: [0, 4, 5],
+    3: [4, 5],
+    4: [],
+    5: [0],
+}
+
+
+class FollowGraphTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create(username=f'user{number}')
+            for number in range(len(EDGES))
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=self.users[user], author=self.users[author])
+            for user, authors in EDGES.items() for author in authors
+        )
+
+    def ids(self, *numbers):
+        return sorted(self.users[number].pk for number in numbers)
+
+    def pk(self, number):
+        return self.users[number].pk
+
+    def test_adjacency_lists(self):
+        self.assertEqual(
+            graph.following(self.pk(0)), array('i', self.ids(1, 2, 3))
+        )
+        self.assertEqual(list(graph.followers(self.pk(0))), self.ids(1, 2, 5))
+        self.assertEqual(graph.followers_count(self.pk(4)), 3)
+        self.assertEqual(list(graph.following(self.pk(4))), [])
+
+    def test_cached_as_bytes_and_read_without_queries(self):
+        graph.following(self.pk(0))
+        version, = feed_cache.versions(
+            graph.scope(graph.FOLLOWING, self.pk(0))
+        )
+        self.assertIsInstance(
+            cache.get(
+                graph.adjacency_key(graph.FOLLOWING, self.pk(0), version)
+            ),
+            bytes,
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.pk(0), self.pk(3)))
+            self.assertFalse(graph.is_following(self.pk(0), self.pk(4)))
+
+    def test_many_lists_built_in_one_query(self):
+        with self.assertNumQueries(1):
+            lists = graph.load_many(
+                graph.FOLLOWING, [user.pk for user in self.users]
+            )
+        self.assertEqual(list(lists[self.pk(3)]), self.ids(4, 5))
+
+    def test_mutual(self):
+        self.assertEqual(list(graph.mutual(self.pk(0))), self.ids(1, 2))
+        self.assertTrue(graph.is_mutual(self.pk(0), self.pk(1)))
+        self.assertFalse(graph.is_mutual(self.pk(0), self.pk(3)))
+        self.assertEqual(
+            list(graph.common_following(self.pk(1), self.pk(3))),
+            self.ids(4),
+        )
+
+    def test_intersect(self):
+        self.assertEqual(
+            graph.intersect(
+                array('i', [2, 5, 9]), array('i', range(0, 100, 1))
+            ),
+            array('i', [2, 5, 9]),
+        )
+        self.assertEqual(
+            list(graph.intersect(array('i', [1, 3]), array('i', [2]))), []
+        )
+
+    def test_suggestions(self):
+        # Авторы user0 (1, 2, 3) подписаны на 4 трижды, на 5 дважды.
+        self.assertEqual(
+            graph.suggestions(self.pk(0)), [self.pk(4), self.pk(5)]
+        )
+        self.assertEqual(graph.suggestions(self.pk(0), limit=1), [self.pk(4)])
+
+    @override_settings(GRAPH_SUGGESTION_SOURCES=1)
+    def test_suggestions_sources_limited(self):
+        self.assertEqual(graph.suggestions(self.pk(0)), [self.pk(4)])
+
+    def test_follow_and_unfollow_refresh_lists(self):
+        graph.following(self.pk(4))
+        graph.followers(self.pk(0))
+        follow = Follow.objects.create(
+            user=self.users[4], author=self.users[0]
+        )
+        self.assertEqual(list(graph.following(self.pk(4))), self.ids(0))
+        self.assertEqual(
+            list(graph.followers(self.pk(0))), self.ids(1, 2, 4, 5)
+        )
+        follow.delete()
+        self.assertEqual(list(graph.following(self.pk(4))), [])
+        self.assertEqual(list(graph.followers(self.pk(0))), self.ids(1, 2, 5))
+
+    def test_rolled_back_follow_not_cached(self):
+        graph.followers(self.pk(4))
+        with self.assertRaises(ZeroDivisionError), db.write():
+            Follow.objects.create(user=self.users[4], author=self.users[0])
+            self.assertTrue(graph.is_following(self.pk(4), self.pk(0)))
+            1 / 0
+        self.assertFalse(graph.is_following(self.pk(4), self.pk(0)))
+        self.assertEqual(graph.followers_count(self.pk(0)), 3)
+
+    def test_list_built_before_commit_discarded(self):
+        """Список, собранный по снимку до фиксации, после неё не читается."""
+        with db.write():
+            Follow.objects.create(user=self.users[4], author=self.users[0])
+            # Так собрал бы список читатель, видящий базу до фиксации.
+            version, = feed_cache.versions(
+                graph.scope(graph.FOLLOWING, self.pk(4))
+            )
+            cache.set(
+                graph.adjacency_key(graph.FOLLOWING, self.pk(4), version),
+                graph.pack([]),
+            )
+        self.assertTrue(graph.is_following(self.pk(4), self.pk(0)))
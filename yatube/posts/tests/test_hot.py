@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import hot
+from posts.models import Comment, Group, Post, User
+
+GROUP_SLUG = 'hot'
+GROUP_URL = reverse('posts:group_list', args=[GROUP_SLUG])
+
+
+@override_settings(GROUP_HOT_POSTS=3, MAX_PAGE_COUNT=2)
+class GroupBufferTests(TransactionTestCase):
+    """Буфер меняется после фиксации, поэтому тесты без общей транзакции."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug=GROUP_SLUG, description='Описание'
+        )
+        self.other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+
+    def buffered(self):
+        return hot.ids(cache.get(hot.buffer_key(self.group.pk)))
+
+    def walk(self):
+        """Id постов всех страниц группы по ссылкам «Следующая»."""
+        ids, params = [], {}
+        while True:
+            page = self.client.get(GROUP_URL, params).context['page_obj']
+            ids.extend(post.pk for post in page)
+            if not page.has_next():
+                return ids
+            params = {'after': page.next_cursor}
+
+    def newest_first(self):
+        return list(Post.objects.filter(group=self.group).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True))
+
+    def test_pages_match_database(self):
+        self.assertEqual(self.walk(), self.newest_first())
+        self.assertEqual(self.buffered(), self.newest_first()[:3])
+        page = self.client.get(GROUP_URL, {'page': 3}).context['page_obj']
+        self.assertEqual([post.pk for post in page], self.newest_first()[4:])
+
+    def test_previous_pages_from_buffer(self):
+        first = self.client.get(GROUP_URL).context['page_obj']
+        second = self.client.get(
+            GROUP_URL, {'after': first.next_cursor}
+        ).context['page_obj']
+        with self.assertNumQueries(0):
+            back = hot.latest(self.group.pk)
+        self.assertEqual(len(back['buffer']), 3)
+        back = self.client.get(
+            GROUP_URL, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_new_post_inserted(self):
+        self.client.get(GROUP_URL)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Новый'
+        )
+        self.assertEqual(self.buffered()[0], post.pk)
+        self.assertEqual(self.walk(), self.newest_first())
+
+    def test_group_change_and_delete(self):
+        self.client.get(GROUP_URL)
+        moved, deleted = self.posts[-1], self.posts[-2]
+        moved.group = self.other
+        moved.save()
+        deleted.delete()
+        self.assertNotIn(moved.pk, self.buffered())
+        self.assertNotIn(deleted.pk, self.buffered())
+        self.assertEqual(self.walk(), self.newest_first())
+        moved.group = self.group
+        moved.save()
+        self.assertEqual(self.buffered()[0], moved.pk)
+
+    def test_rolled_back_post_not_inserted(self):
+        self.client.get(GROUP_URL)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            post = Post.objects.create(
+                author=self.author, group=self.group, text='Откачен'
+            )
+            raise RuntimeError
+        self.assertNotIn(post.pk, self.buffered())
+        self.assertEqual(self.walk(), self.newest_first())
+
+    @override_settings(GROUP_HOT_POSTS=10)
+    def test_complete_only_with_shared_cache(self):
+        """Полноте буфера в кэше процесса не верим."""
+        with override_settings(CACHE_SHARED=False):
+            self.assertFalse(hot.latest(self.group.pk)['complete'])
+        with override_settings(CACHE_SHARED=True):
+            self.assertTrue(hot.latest(self.group.pk)['complete'])
+
+
+@override_settings(GROUP_TRENDING_HALF_LIFE=60 * 60)
+class TrendingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug=GROUP_SLUG, description='Описание'
+        )
+        self.fresh, self.old, self.quiet = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=text
+            )
+            for text in ('Свежий', 'Старый спор', 'Тихий')
+        ]
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.old, author=self.author, text='Давно'
+            )
+        Comment.objects.filter(post=self.old).update(
+            created=timezone.now() - timedelta(days=1)
+        )
+        Comment.objects.create(post=self.fresh, author=self.author, text='Да')
+
+    def ranked(self):
+        page = self.client.get(
+            GROUP_URL, {'order': 'trending'}
+        ).context['page_obj']
+        return [post.pk for post in page]
+
+    def test_recent_comments_outweigh_old(self):
+        self.assertEqual(
+            self.ranked(), [self.fresh.pk, self.old.pk, self.quiet.pk]
+        )
+
+    def test_comments_counted_incrementally(self):
+        self.ranked()
+        for _ in range(2):
+            Comment.objects.create(
+                post=self.quiet, author=self.author, text='Ещё'
+            )
+        with self.assertNumQueries(0):
+            ranking = hot.trending(self.group.pk)
+        self.assertEqual(ranking, [self.quiet.pk, self.fresh.pk, self.old.pk])
+
+    def test_trending_page_cached_separately(self):
+        latest = self.client.get(GROUP_URL).content.decode()
+        self.assertLess(latest.index('Тихий'), latest.index('Свежий'))
+        trending = self.client.get(
+            GROUP_URL, {'order': 'trending'}
+        ).content.decode()
+        self.assertLess(trending.index('Свежий'), trending.index('Тихий'))
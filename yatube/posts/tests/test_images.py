@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.forms import PostForm
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+MODEL = 0x0110
+
+
+def upload(size=(40, 20), format='JPEG', mode='RGB', name='photo', **save):
+    output = BytesIO()
+    Image.new(mode, size, 'red').save(output, format, **save)
+    return SimpleUploadedFile(
+        f'{name}.{format.lower()}', output.getvalue(),
+        content_type=f'image/{format.lower()}',
+    )
+
+
+def stored(name):
+    return Image.open(Post.image.field.storage.open(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIDE=32)
+class ImagePipelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, image):
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+        return Post.objects.latest('pk')
+
+    def test_reencoded_and_limited(self):
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        post = self.create(upload((64, 16), exif=exif))
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{64}\.jpg$')
+        with stored(post.image.name) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (8, 32))
+            self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_transparency_kept(self):
+        post = self.create(upload(format='PNG', mode='RGBA'))
+        self.assertTrue(post.image.name.endswith('.png'))
+        with stored(post.image.name) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_png_metadata_removed(self):
+        exif = Image.Exif()
+        exif[MODEL] = 'SecretCam'
+        post = self.create(upload(format='PNG', mode='RGBA', exif=exif))
+        self.assertTrue(post.image.name.endswith('.png'))
+        with stored(post.image.name) as image:
+            self.assertNotIn(MODEL, image.getexif())
+            self.assertNotIn('exif', image.info)
+
+    def test_same_content_stored_once(self):
+        first = self.create(upload(name='first'))
+        second = self.create(upload(name='second'))
+        self.assertEqual(first.image.name, second.image.name)
+        digest = first.image.name.split('/')[1].split('.')[0]
+        self.assertEqual(
+            [
+                name for name in Post.image.field.storage.listdir('posts')[1]
+                if name.startswith(digest)
+            ],
+            [f'{digest}.jpg'],
+        )
+
+    def test_unchanged_image_not_reprocessed(self):
+        post = self.create(upload())
+        form = PostForm({'text': 'Правка'}, instance=post)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().image.name, post.image.name)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        form = PostForm({'text': 'Пост'}, {'image': upload((20, 10))})
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_too_large_file(self):
+        with self.assertRaises(ValidationError):
+            images.process(upload())
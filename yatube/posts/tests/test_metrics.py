@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+INDEX_URL = reverse('posts:index')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing(self):
+        timing = Client().get(INDEX_URL)['Server-Timing']
+        for name in ('total', 'db', 'tpl', 'cache', 'thumb'):
+            with self.subTest(name=name):
+                self.assertRegex(timing, rf'\b{name};dur=\d+\.\d')
+        self.assertIn('desc="1 queries"', timing)
+
+    def test_cache_hits_and_misses(self):
+        self.assertIn('0 hits', Client().get(INDEX_URL)['Server-Timing'])
+        self.assertIn('0 misses', Client().get(INDEX_URL)['Server-Timing'])
+
+    def test_histograms_by_view(self):
+        Client().get(INDEX_URL)
+        Client().get(INDEX_URL)
+        text = Client().get(METRICS_URL, REMOTE_ADDR='127.0.0.1').content
+        text = text.decode()
+        self.assertIn(
+            'yatube_request_seconds_count{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="1"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_seconds_bucket{view="posts:index",le="+Inf"} 2',
+            text
+        )
+        self.assertIn('yatube_cache_misses_total{view="posts:index"}', text)
+
+    def test_template_time_recorded(self):
+        Client().get(INDEX_URL)
+        self.assertGreater(
+            metrics.histogram('template_seconds', 'posts:index').sum, 0
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_restricted(self):
+        response = Client().get(METRICS_URL, REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        """С токеном адрес не важен: прокси передаёт свой 127.0.0.1."""
+        for authorization, status in (
+            (None, 404),
+            ('Bearer other', 404),
+            ('Bearer s3cret', 200),
+        ):
+            with self.subTest(authorization=authorization):
+                headers = {'REMOTE_ADDR': '127.0.0.1'}
+                if authorization:
+                    headers['HTTP_AUTHORIZATION'] = authorization
+                response = Client().get(METRICS_URL, **headers)
+                self.assertEqual(response.status_code, status)
+
+
+class HistogramTests(TestCase):
+    def test_cumulative_buckets(self):
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(
+            list(histogram.samples()), [('1', 2), ('5', 3), ('+Inf', 4)]
+        )
+        self.assertEqual(histogram.sum, 14.5)
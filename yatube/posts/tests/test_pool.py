@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.db import OperationalError, connections
+from django.test import Client, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import pool
+
+ALIAS = 'pooled'
+POOL = {
+    'SIZE': 2,
+    'MIN': 2,
+    'TIMEOUT': 5,
+    'MAX_AGE': 60,
+    'HEALTH_CHECK_IDLE': 60,
+}
+
+
+@override_settings(DATABASE_POOL=POOL)
+class ConnectionPoolTests(SimpleTestCase):
+    databases = {ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': f'{cls.directory}/pooled.sqlite3',
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        pool.reset()
+        self.addCleanup(pool.reset)
+        self.addCleanup(connections[ALIAS].close)
+
+    def stats(self):
+        return pool.stats()[ALIAS]
+
+    def open(self):
+        connection = connections[ALIAS]
+        connection.ensure_connection()
+        return connection.connection
+
+    def in_thread(self, work):
+        def run():
+            try:
+                work()
+            finally:
+                connections[ALIAS].close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_connection_reused_after_close(self):
+        first = self.open()
+        connections[ALIAS].close()
+        self.assertIs(self.open(), first)
+        self.assertTrue(connections[ALIAS].reused_connection)
+        stats = self.stats()
+        self.assertEqual(
+            (stats['created'], stats['acquired'], stats['in_use']), (1, 2, 1)
+        )
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_threads_capped_and_wait(self):
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            self.open()
+            holding.set()
+            release.wait(5)
+
+        threads = [self.in_thread(hold) for _ in range(POOL['SIZE'])]
+        holding.wait(5)
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        self.open()
+        for thread in threads + [timer]:
+            thread.join()
+        stats = self.stats()
+        self.assertEqual(stats['created'], POOL['SIZE'])
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    @override_settings(DATABASE_POOL={**POOL, 'SIZE': 1, 'TIMEOUT': 0.05})
+    def test_timeout_when_exhausted(self):
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            self.open()
+            holding.set()
+            release.wait(5)
+
+        thread = self.in_thread(hold)
+        holding.wait(5)
+        try:
+            with self.assertRaises(OperationalError):
+                self.open()
+        finally:
+            release.set()
+            thread.join()
+
+    @override_settings(DATABASE_POOL={**POOL, 'MAX_AGE': 0})
+    def test_old_connection_recycled(self):
+        first = self.open()
+        connections[ALIAS].close()
+        self.assertIsNot(self.open(), first)
+        self.assertEqual(self.stats()['recycled'], 1)
+
+    @override_settings(DATABASE_POOL={**POOL, 'HEALTH_CHECK_IDLE': 0})
+    def test_broken_connection_replaced(self):
+        first = self.open()
+        connections[ALIAS].close()
+        first.close()
+        self.assertIsNot(self.open(), first)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(self.stats()['health_check_failures'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS note (text TEXT)')
+        raw = self.open()
+        raw.execute('BEGIN')
+        raw.execute("INSERT INTO note VALUES ('не зафиксировано')")
+        connections[ALIAS].close()
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM note')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_warm_up_and_metrics(self):
+        pool.warm_up()
+        stats = self.stats()
+        self.assertEqual(
+            (stats['created'], stats['idle'], stats['in_use']),
+            (POOL['MIN'], POOL['MIN'], 0),
+        )
+        content = Client().get(reverse('metrics')).content.decode()
+        self.assertIn(
+            f'yatube_db_pool_connections{{alias="{ALIAS}",state="idle"}} 2',
+            content,
+        )
+        self.assertIn(
+            f'yatube_db_pool_created_total{{alias="{ALIAS}"}} 2', content
+        )
+
+    def test_fork_forgets_parent_pools(self):
+        """Рабочий процесс не получает соединений родителя."""
+        pool.warm_up()
+        pid = os.fork()
+        if not pid:
+            os._exit(0 if pool.stats() == {} else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.stats()['idle'], POOL['MIN'])
+
+    @override_settings(DATABASE_POOL={**POOL, 'SIZE': 1})
+    def test_no_wait_fails_fast(self):
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            self.open()
+            holding.set()
+            release.wait(5)
+
+        thread = self.in_thread(hold)
+        holding.wait(5)
+        try:
+            with pool.no_wait(), self.assertRaises(pool.Exhausted):
+                self.open()
+        finally:
+            release.set()
+            thread.join()
@@ -0,0 +1,97 @@
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics, profiling
+from core.backends.templates import DjangoTemplates
+from posts import thumbnails
+from posts.models import Post, User
+
+INDEX_URL = reverse('posts:index')
+IMAGE = 'posts/picture.gif'
+
+
+def tag_line(template_name, tag):
+    path = os.path.join(settings.TEMPLATES_DIR, template_name)
+    with open(path) as template:
+        for number, line in enumerate(template, 1):
+            if tag in line:
+                return number
+
+
+def engine(loaders):
+    return DjangoTemplates({
+        'NAME': 'warm-up',
+        'DIRS': [settings.TEMPLATES_DIR],
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': loaders},
+    })
+
+
+class WarmUpTests(TestCase):
+    def test_compiles_every_template_once(self):
+        templates = engine([(
+            'django.template.loaders.cached.Loader',
+            ['django.template.loaders.filesystem.Loader'],
+        )])
+        count = sum(
+            len(files) for _, _, files in os.walk(settings.TEMPLATES_DIR)
+        )
+        self.assertEqual(templates.warm_up(), count)
+        loader = templates.engine.template_loaders[0]
+        self.assertIn('base.html', loader.get_template_cache)
+        self.assertIn('includes/header.html', loader.get_template_cache)
+
+    def test_skipped_without_cached_loader(self):
+        templates = engine(['django.template.loaders.filesystem.Loader'])
+        self.assertEqual(templates.warm_up(), 0)
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Пост с картинкой',
+            image=IMAGE,
+        )
+
+    def setUp(self):
+        cache.clear()
+        cache.set(thumbnails.urls_key(IMAGE), {'card': '/media/card.jpg'})
+        profiling.reset()
+
+    def test_disabled_by_default(self):
+        Client().get(INDEX_URL)
+        self.assertFalse(profiling.enabled())
+        self.assertEqual(profiling.report(), [])
+
+    def test_templates_and_thumbnails(self):
+        with profiling.profiling():
+            Client().get(INDEX_URL)
+        self.assertFalse(profiling.enabled())
+        rows = {(row['kind'], row['name']): row for row in profiling.report()}
+        for key in [
+            ('template', 'posts/index.html'),
+            ('template', 'base.html'),
+            ('template', 'includes/header.html'),
+            ('thumbnail', 'posts/index.html:{}'.format(
+                tag_line('posts/index.html', 'thumbnail_url')
+            )),
+        ]:
+            with self.subTest(key=key):
+                self.assertEqual(rows[key]['calls'], 1)
+        index = rows['template', 'posts/index.html']
+        self.assertLess(index['self_seconds'], index['seconds'])
+
+    def test_exposed_in_metrics(self):
+        with profiling.profiling():
+            Client().get(INDEX_URL)
+        self.assertIn(
+            'yatube_template_profile_calls_total'
+            '{kind="template",name="base.html"} 1',
+            metrics.exposition(),
+        )
@@ -0,0 +1,90 @@
+import re
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator, decode_cursor
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+CURSOR = '1650000000000000_100'
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц идут по индексам и без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author_name')
+        cls.group = Group.objects.create(
+            title='Тестовое название',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.author,
+            group=cls.group,
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def page(self, queryset, after=False, **options):
+        paginator = CursorPaginator(queryset, 10, **options)
+        queryset = queryset.order_by(*paginator.ordering())
+        if after:
+            queryset = queryset.filter(
+                paginator.beyond(decode_cursor(CURSOR))
+            )
+        return queryset[:11]
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, queryset):
+        plan = self.query_plan(queryset)
+        for line in plan:
+            self.assertIsNone(FULL_SCAN.search(line), plan)
+            self.assertNotIn(TEMP_SORT, line, plan)
+
+    def test_feed_queries_use_indexes(self):
+        feeds = {
+            'index': Post.objects.for_feed(),
+            'group_list': self.group.posts.for_feed(),
+            'profile': self.author.posts.for_feed(),
+        }
+        for name, queryset in feeds.items():
+            for after in (False, True):
+                with self.subTest(view=name, after=after):
+                    self.assertIndexedPlan(self.page(queryset, after))
+
+    def test_follow_feed_uses_indexes(self):
+        feed = timeline.feed(self.user)
+        for after in (False, True):
+            with self.subTest(after=after):
+                self.assertIndexedPlan(
+                    self.page(feed['post_list'], after, keys=feed['keys'])
+                )
+        posts = Post.objects.for_feed().filter(pk__in=[self.post.pk])
+        self.assertIndexedPlan(posts.order_by())
+
+    def test_post_detail_queries_use_indexes(self):
+        comments = Comment.objects.filter(post=self.post).select_related(
+            'author'
+        )
+        for after in (False, True):
+            with self.subTest(after=after):
+                self.assertIndexedPlan(self.page(
+                    comments, after, keys=('created', 'pk'), descending=False
+                ))
+        self.assertIndexedPlan(
+            Follow.objects.filter(author=self.author, user=self.user)
+        )
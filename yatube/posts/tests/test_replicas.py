@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from posts import feed_cache
+from posts.models import Post, User
+
+INDEX_URL = reverse('posts:index')
+CREATE_URL = reverse('posts:post_create')
+PROFILE_URL = reverse('posts:profile', args=['author'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG_TOLERANCE=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная база — тестовая, реплика — отдельный файл SQLite.
+
+    Реплика получает копию основной базы только в `replicate`, поэтому
+    всё записанное после неё видно лишь в основной базе.
+    """
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'{cls.directory}/replica.sqlite3',
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.replicate()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def replicate(self):
+        primary, replica = connections['default'], connections['replica']
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    def test_feeds_read_from_replica(self):
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = Client().get(INDEX_URL)
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Новый пост')
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_writer_reads_own_writes(self):
+        response = self.client.post(CREATE_URL, {'text': 'Свежий пост'})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertContains(self.client.get(PROFILE_URL), 'Свежий пост')
+        self.assertNotContains(Client().get(INDEX_URL), 'Свежий пост')
+
+    def test_stickiness_expires(self):
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = str(
+            time.time() - settings.REPLICA_LAG_TOLERANCE
+        )
+        self.assertNotContains(self.client.get(INDEX_URL), 'Новый пост')
+
+    def test_write_views_read_primary(self):
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(
+            reverse('posts:post_edit', args=[post.pk])
+        )
+        self.assertContains(response, 'Новый пост')
+
+    def test_fresh_fragments_cached_briefly(self):
+        fresh = feed_cache.new_version()
+        old = fresh - 10 ** 8
+        self.assertEqual(
+            feed_cache.timeout([fresh]), settings.FEED_CACHE_TIMEOUT
+        )
+        routers.use_replica()
+        try:
+            self.assertEqual(feed_cache.timeout([old, fresh]), 5)
+            self.assertEqual(
+                feed_cache.timeout([old]), settings.FEED_CACHE_TIMEOUT
+            )
+        finally:
+            routers.release()
@@ -0,0 +1,113 @@
+import fcntl
+import shutil
+import tempfile
+import threading
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+SEARCH_URL = reverse('posts:search')
+TEMP_INDEX_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class StemmerTests(TestCase):
+    def test_inflected_forms_share_stem(self):
+        """Словоформы приводятся к одной основе."""
+        for words in (
+            ('книга', 'книги', 'книгой', 'книгами'),
+            ('красивый', 'красивая', 'красивых'),
+            ('читать', 'читаю', 'читали'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(word) for word in words}), 1)
+
+    def test_terms_lowercase_and_split(self):
+        self.assertEqual(search.terms('Ёлки, ЁЛКИ!'), ['елк', 'елк'])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+
+    def create(self, text):
+        return Post.objects.create(author=self.user, text=text)
+
+    def test_finds_inflected_form(self):
+        post = self.create('Сегодня читали интересные книги')
+        self.create('Совсем о другом')
+        self.assertEqual(search.search('книгой'), [post.pk])
+
+    def test_prefers_frequent_term(self):
+        """Пост, где слово встречается чаще, выше в выдаче."""
+        rare = self.create('Кошка спит, а собака лает и бегает по двору')
+        frequent = self.create('Кошка и кошки: про кошек')
+        self.assertEqual(search.search('кошка'), [frequent.pk, rare.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        post = self.create('Первый вариант')
+        post.text = 'Исправленный текст'
+        post.save()
+        self.assertEqual(search.search('вариант'), [])
+        self.assertEqual(search.search('исправленный'), [post.pk])
+        post.delete()
+        self.assertEqual(search.search('исправленный'), [])
+
+    def test_rebuild_command(self):
+        post = self.create('Потерянный пост')
+        search.get_backend().clear()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('потерянный'), [post.pk])
+
+    def test_search_page(self):
+        post = self.create('Путешествие по горам')
+        response = Client().get(SEARCH_URL, {'q': 'горы'})
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertContains(response, post.text)
+
+    def test_search_page_paginates(self):
+        for number in range(settings.MAX_PAGE_COUNT + 3):
+            self.create(f'Заметка номер {number}')
+        response = Client().get(SEARCH_URL, {'q': 'заметки', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_empty_query(self):
+        self.create('Что-нибудь')
+        response = Client().get(SEARCH_URL)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+@override_settings(
+    SEARCH_BACKEND='posts.search.PythonIndexBackend',
+    SEARCH_INDEX_PATH=f'{TEMP_INDEX_DIR}/index',
+)
+class PythonIndexTests(SearchTests):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_INDEX_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        search.get_backend().clear()
+
+    def test_waits_for_other_process_lock(self):
+        """Запись ждёт блокировки индекса, взятой другим процессом."""
+        backend = search.get_backend()
+        with open(f'{settings.SEARCH_INDEX_PATH}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            thread = threading.Thread(
+                target=backend.index, args=(1, 'заблокированный')
+            )
+            thread.start()
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join(5)
+        self.assertEqual(backend.search('заблокированный', 10), [1])
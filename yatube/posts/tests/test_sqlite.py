@@ -0,0 +1,141 @@
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from yatube import db
+
+ALIAS = 'stress'
+WRITERS = 4
+WRITES = 25
+
+
+class SqliteConcurrencyTests(SimpleTestCase):
+    """Файл SQLite, в который пишут и читают несколько потоков.
+
+    У каждого потока своё соединение (свой `DatabaseWrapper`), как у
+    потоков сервера.
+    """
+
+    databases = {ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = f'{cls.directory}/stress.sqlite3'
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS counter')
+            cursor.execute(
+                'CREATE TABLE counter (number INTEGER PRIMARY KEY)'
+            )
+
+    def query(self, sql):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def in_thread(self, work, errors):
+        def run():
+            try:
+                work()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[ALIAS].close()
+        return threading.Thread(target=run)
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self.query('PRAGMA journal_mode'), 'wal')
+        self.assertEqual(self.query('PRAGMA busy_timeout'), 5000)
+        self.assertEqual(self.query('PRAGMA synchronous'), 1)
+
+    def test_concurrent_reads_and_writes(self):
+        """Записи «прочитать, затем вставить» не падают на блокировке."""
+        errors, done = [], threading.Event()
+
+        def writer():
+            for _ in range(WRITES):
+                with db.write(ALIAS):
+                    number = self.query(
+                        'SELECT COALESCE(MAX(number), 0) FROM counter'
+                    )
+                    with connections[ALIAS].cursor() as cursor:
+                        cursor.execute(
+                            'INSERT INTO counter VALUES (%s)', [number + 1]
+                        )
+
+        def reader():
+            while not done.is_set():
+                self.query('SELECT COUNT(*) FROM counter')
+
+        writers = [self.in_thread(writer, errors) for _ in range(WRITERS)]
+        readers = [self.in_thread(reader, errors) for _ in range(2)]
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            self.query('SELECT COUNT(*) FROM counter'), WRITERS * WRITES
+        )
+
+    def test_reader_not_blocked_by_open_write(self):
+        errors, written, finish = [], threading.Event(), threading.Event()
+
+        def writer():
+            with db.write(ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute('INSERT INTO counter VALUES (1)')
+                written.set()
+                finish.wait(5)
+
+        thread = self.in_thread(writer, errors)
+        thread.start()
+        written.wait(5)
+        self.assertEqual(self.query('SELECT COUNT(*) FROM counter'), 0)
+        finish.set()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.query('SELECT COUNT(*) FROM counter'), 1)
+
+    def test_waits_for_writer_in_other_process(self):
+        """Чужую блокировку записи `write` дожидается по busy_timeout."""
+        other = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('INSERT INTO counter VALUES (1)')
+        timer = threading.Timer(0.2, other.execute, ['COMMIT'])
+        timer.start()
+        try:
+            with db.write(ALIAS):
+                number = self.query('SELECT MAX(number) FROM counter')
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO counter VALUES (%s)', [number + 1]
+                    )
+        finally:
+            timer.join()
+            other.close()
+        self.assertEqual(self.query('SELECT COUNT(*) FROM counter'), 2)
@@ -0,0 +1,53 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+USERNAME = 'reader'
+AUTHOR_USERNAME = 'author_name'
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.user_author = User.objects.create(username=AUTHOR_USERNAME)
+
+    def assertStats(self, user, **expected):
+        stats = AuthorStats.objects.get(user=user)
+        for name, value in expected.items():
+            with self.subTest(name=name):
+                self.assertEqual(getattr(stats, name), value)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(text='Пост', author=self.user_author)
+        Post.objects.create(text='Ещё пост', author=self.user_author)
+        Comment.objects.create(text='Коммент', post=post, author=self.user)
+        follow = Follow.objects.create(user=self.user, author=self.user_author)
+        self.assertStats(self.user_author, posts_count=2, followers_count=1)
+        self.assertStats(self.user, comments_count=1, following_count=1)
+        post.delete()
+        follow.delete()
+        self.assertStats(self.user_author, posts_count=1, followers_count=0)
+        self.assertStats(self.user, comments_count=0, following_count=0)
+
+    def test_profile_reads_stats(self):
+        """Профиль показывает число постов из счётчика."""
+        Post.objects.create(text='Пост', author=self.user_author)
+        response = Client().get(PROFILE_URL)
+        self.assertEqual(response.context['author_stats'].posts_count, 1)
+
+    def test_recount_fixes_drift(self):
+        """Команда recount_stats исправляет расхождения."""
+        Post.objects.create(text='Пост', author=self.user_author)
+        AuthorStats.objects.filter(user=self.user_author).update(
+            posts_count=10
+        )
+        call_command('recount_stats', stdout=StringIO())
+        self.assertStats(self.user_author, posts_count=1)
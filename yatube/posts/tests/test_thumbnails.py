@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+INDEX_URL = reverse('posts:index')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user_test')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generate_stores_urls(self):
+        """Фоновая задача сохраняет адреса всех миниатюр."""
+        urls = thumbnails.generate_in_background(self.post.image.name)
+        self.assertEqual(set(urls), set(settings.POST_THUMBNAILS))
+        self.assertEqual(
+            cache.get(thumbnails.urls_key(self.post.image.name)), urls
+        )
+
+    def test_template_reads_precomputed_url(self):
+        """Шаблон выводит заранее подготовленный адрес миниатюры."""
+        cache.set(
+            thumbnails.urls_key(self.post.image.name),
+            {'card': '/media/cache/ready.jpg'},
+            None
+        )
+        self.assertContains(
+            Client().get(INDEX_URL), 'src="/media/cache/ready.jpg"'
+        )
+
+    def test_backfill_command(self):
+        """Команда generate_thumbnails обрабатывает загруженные картинки."""
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertIsNotNone(
+            cache.get(thumbnails.urls_key(self.post.image.name))
+        )
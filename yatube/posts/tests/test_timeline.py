@@ -0,0 +1,145 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+
+from posts import timeline
+from posts.models import AuthorStats, Follow, Post, TimelineEntry, User
+
+USERNAME = 'reader'
+AUTHOR_USERNAME = 'author_name'
+FOLLOW_URL = reverse('posts:follow_index')
+PROFILE_FOLLOW_URL = reverse('posts:profile_follow', args=[AUTHOR_USERNAME])
+PROFILE_UNFOLLOW_URL = reverse(
+    'posts:profile_unfollow',
+    args=[AUTHOR_USERNAME]
+)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.user_author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.user_author,
+        )
+
+    def setUp(self):
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_follow_fills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.reader.get(PROFILE_FOLLOW_URL)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+        response = self.reader.get(FOLLOW_URL)
+        self.assertIn(self.old_post, response.context['page_obj'])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост автора попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.user_author)
+        post = Post.objects.create(text='Новый пост', author=self.user_author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.user_author)
+        self.reader.get(PROFILE_UNFOLLOW_URL)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+        response = self.reader.get(FOLLOW_URL)
+        self.assertNotIn(self.old_post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_read_at_request_time(self):
+        """Посты «звёздных» авторов не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.user, author=self.user_author)
+        post = Post.objects.create(text='Новый пост', author=self.user_author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.reader.get(FOLLOW_URL)
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_backfill_command(self):
+        """Команда backfill_timeline восстанавливает ленты."""
+        Follow.objects.create(user=self.user, author=self.user_author)
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+
+    def test_deleted_post_skipped(self):
+        """Записи ленты удалённого поста пропускаются при загрузке."""
+        Follow.objects.create(user=self.user, author=self.user_author)
+        entries = list(TimelineEntry.objects.filter(user=self.user))
+        Post.objects.filter(pk=self.old_post.pk).delete()
+        self.assertEqual(timeline.load_posts(entries), [])
+
+
+@override_settings(
+    TIMELINE_CELEBRITY_FOLLOWERS=3,
+    TIMELINE_CELEBRITY_FOLLOWERS_MIN=2,
+    TIMELINE_WORKERS=0,
+    TIMELINE_BACKFILL_BATCH=1,
+)
+class CelebrityTests(TransactionTestCase):
+    """Признак снимается после фиксации, поэтому без общей транзакции."""
+
+    def setUp(self):
+        self.author = User.objects.create(username=AUTHOR_USERNAME)
+        self.readers = [
+            User.objects.create(username=f'reader_{number}')
+            for number in range(3)
+        ]
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def is_celebrity(self):
+        return AuthorStats.objects.get(user=self.author).celebrity
+
+    def unfollow(self, reader):
+        Follow.objects.filter(user=reader, author=self.author).delete()
+
+    def test_demotion_has_hysteresis(self):
+        """Между порогами автор остаётся «звездой», ниже — раскладывается."""
+        self.assertTrue(self.is_celebrity())
+        self.assertFalse(TimelineEntry.objects.filter(post=self.post).exists())
+        self.unfollow(self.readers[0])
+        self.assertTrue(self.is_celebrity())
+        self.assertFalse(TimelineEntry.objects.filter(post=self.post).exists())
+        self.unfollow(self.readers[1])
+        self.assertFalse(self.is_celebrity())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.readers[2], post=self.post
+        ).exists())
+        client = Client()
+        client.force_login(self.readers[2])
+        response = client.get(FOLLOW_URL)
+        self.assertIn(self.post, response.context['page_obj'])
+
+    def test_backfill_command_demotes(self):
+        """Команда backfill_timeline раскладывает посты бывших «звёзд»."""
+        AuthorStats.objects.filter(user=self.author).update(
+            followers_count=1
+        )
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertFalse(self.is_celebrity())
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=self.post).count(), 3
+        )
@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import hot, search
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry, User)
+
+KINDS = ('groups', 'posts', 'comments', 'follows')
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Первая заметка'
+        )
+        Post.objects.create(author=self.author, text='Вторая заметка')
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Текст, "с кавычками"'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self, kind, format='ndjson'):
+        path = f'{self.directory}/{kind}.{format}'
+        call_command(
+            'export_data', kind, path, format=format, stderr=StringIO()
+        )
+        return path
+
+    def load(self, kind, path, **options):
+        call_command('import_data', kind, path, stdout=StringIO(), **options)
+
+    def write(self, kind, text):
+        path = f'{self.directory}/{kind}.ndjson'
+        with open(path, 'w') as stream:
+            stream.write(text)
+        return path
+
+    def test_round_trip(self):
+        for format in ('ndjson', 'csv'):
+            with self.subTest(format=format):
+                paths = {kind: self.export(kind, format) for kind in KINDS}
+                pub_date = self.post.pub_date
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                Follow.objects.all().delete()
+                for kind in KINDS:
+                    self.load(kind, paths[kind], format=format)
+                post = Post.objects.select_related('group').get(
+                    pk=self.post.pk
+                )
+                self.assertEqual(post.pub_date, pub_date)
+                self.assertEqual(post.group.slug, 'group')
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertEqual(
+                    Comment.objects.get(pk=self.comment.pk).text,
+                    self.comment.text,
+                )
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.author
+                ).exists())
+
+    def test_derived_data_rebuilt(self):
+        """Ленты, поиск и счётчики обновляются без сигналов."""
+        paths = {kind: self.export(kind) for kind in ('posts', 'follows')}
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        self.load('follows', paths['follows'])
+        self.load('posts', paths['posts'])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertCountEqual(
+            search.search('заметка'), Post.objects.values_list('pk', flat=True)
+        )
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (2, 1))
+
+    def test_group_buffer_dropped(self):
+        """Импорт постов сбрасывает буфер последних постов группы."""
+        path = self.export('posts')
+        Post.objects.all().delete()
+        cache.set(hot.buffer_key(self.group.pk), {
+            'entries': [], 'complete': True, 'scored': False,
+        })
+        self.load('posts', path)
+        self.assertIsNone(cache.get(hot.buffer_key(self.group.pk)))
+        self.assertEqual(
+            hot.latest(self.group.pk)['buffer'][0]['pk'], self.post.pk
+        )
+
+    def test_unknown_user(self):
+        path = self.write(
+            'follows', '{"user": "stranger", "author": "author"}\n'
+        )
+        with self.assertRaises(CommandError):
+            self.load('follows', path)
+        self.load('follows', path, create_users=True)
+        self.assertTrue(
+            Follow.objects.filter(user__username='stranger').exists()
+        )
+
+    def test_batches(self):
+        path = self.write('groups', ''.join(
+            f'{{"slug": "slug-{number}", "title": "Группа {number}"}}\n'
+            for number in range(7)
+        ))
+        self.load('groups', path, batch_size=3)
+        self.assertEqual(
+            Group.objects.filter(slug__startswith='slug-').count(), 7
+        )
+
+    def test_conflicts(self):
+        path = self.export('groups')
+        with self.assertRaises(CommandError):
+            self.load('groups', path)
+        self.load('groups', path, ignore_conflicts=True)
+        self.assertEqual(Group.objects.count(), 1)
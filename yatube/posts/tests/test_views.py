@@ -2,11 +2,14 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.shortcuts import reverse
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Comment, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User
 from yatube.settings import MAX_PAGE_COUNT
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -90,7 +93,7 @@ class PagesTests(TestCase):
                 'posts:post_detail',
                 kwargs={'post_id': self.post.id})
         )
-        comment = response.context['comments'].first()
+        comment = response.context['comments'][0]
         self.assertIsNotNone(comment, 'Нет комментария')
         self.assertEqual(comment, self.comment)
 
@@ -124,3 +127,158 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(
             len(self.client.get(INDEX_URL + '?page=2').context['page_obj']), 3
         )
+
+    def test_cursor_pages(self):
+        """Курсорные ссылки ведут на следующую и предыдущую страницы."""
+        first = self.client.get(INDEX_URL).context['page_obj']
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            INDEX_URL, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        self.assertTrue(set(first).isdisjoint(second))
+        back = self.client.get(
+            INDEX_URL, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница не считает общее число постов."""
+        first = self.client.get(INDEX_URL).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(INDEX_URL, {'after': first.next_cursor})
+        self.assertFalse(any(
+            'COUNT(*)' in query['sql'] for query in queries.captured_queries
+        ))
+
+
+@override_settings(CACHE_SHARED=True)
+class FeedQueriesTest(TestCase):
+    """Число запросов на страницу ленты не зависит от числа постов.
+
+    Полноте буфера группы верим только в общем кэше.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовое название',
+            slug=SLUG,
+            description='Тестовое описание',
+        )
+        for number in range(MAX_PAGE_COUNT):
+            author = User.objects.create(username=f'author_{number}')
+            group = Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description='Тестовое описание',
+            )
+            post = Post.objects.create(
+                text='Тестовый текст поста',
+                author=author,
+                group=cls.group if number % 2 else group,
+            )
+            Comment.objects.create(text='Коммент', post=post, author=author)
+            Follow.objects.create(user=cls.user, author=author)
+        cls.PROFILE_URL = reverse('posts:profile', args=['author_0'])
+        cls.POST_URL = reverse('posts:post_detail', args=[post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_feed_query_budget(self):
+        """Страницы лент укладываются в фиксированный бюджет запросов."""
+        # Группа, профиль и пост тратят один запрос на валидаторы
+        # условного GET, группа — ещё один на сборку буфера постов.
+        budgets = [
+            [INDEX_URL, 3],
+            [POST_GROUP_URL, 6],
+            [self.PROFILE_URL, 6],
+            [FOLLOW_URL, 5],
+            [self.POST_URL, 5],
+        ]
+        for url, budget in budgets:
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+
+    def test_group_buffer_saves_query(self):
+        """Из готового буфера страница группы читает посты по id."""
+        self.client.get(POST_GROUP_URL)
+        with self.assertNumQueries(5):
+            self.client.get(POST_GROUP_URL)
+
+    def test_feed_has_comment_count(self):
+        """Посты ленты содержат число комментариев."""
+        page_obj = self.client.get(INDEX_URL).context['page_obj']
+        self.assertEqual(
+            [post.comment_count for post in page_obj],
+            [1] * MAX_PAGE_COUNT
+        )
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=User.objects.create(username=USERNAME),
+        )
+        for number in range(12):
+            Comment.objects.create(
+                text=f'Коммент {number}',
+                post=cls.post,
+                author=User.objects.create(username=f'reader_{number}'),
+            )
+        cls.POST_URL = reverse('posts:post_detail', args=[cls.post.id])
+        cls.COMMENTS_URL = reverse('posts:comment_list', args=[cls.post.id])
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_first_page_in_post_detail(self):
+        comments = self.client.get(self.POST_URL).context['comments']
+        self.assertEqual(
+            self.texts(comments), [f'Коммент {number}' for number in range(5)]
+        )
+        self.assertTrue(comments.has_next())
+
+    def test_fragment_continues_thread(self):
+        """Фрагмент отдаёт следующие комментарии по курсору."""
+        cursor = self.client.get(self.POST_URL).context['comments'].next_cursor
+        response = self.client.get(self.COMMENTS_URL, {'after': cursor})
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            [f'Коммент {number}' for number in range(5, 10)],
+        )
+        self.assertContains(response, 'js-more-comments')
+
+    def test_last_fragment_has_no_link(self):
+        response = self.client.get(self.COMMENTS_URL)
+        for _ in range(2):
+            response = self.client.get(self.COMMENTS_URL, {
+                'after': response.context['comments'].next_cursor
+            })
+        self.assertEqual(len(response.context['comments']), 2)
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_fragment_query_budget(self):
+        """Пост проверяется, а авторы комментариев грузятся одним запросом."""
+        with self.assertNumQueries(2):
+            self.client.get(self.COMMENTS_URL)
+
+    def test_fragment_of_missing_post(self):
+        url = reverse('posts:comment_list', args=[self.post.id + 1000])
+        self.assertEqual(self.client.get(url).status_code, 404)
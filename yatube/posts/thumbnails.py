@@ -0,0 +1,89 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+После сохранения поста с новой картинкой все размеры из
+`settings.POST_THUMBNAILS` создаются в пуле потоков, а их адреса
+складываются в кэш. Шаблоны читают готовые адреса и создают миниатюру
+сами только если фоновая задача ещё не успела.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+executor = None
+_executor_lock = threading.Lock()
+
+
+def urls_key(name):
+    return f'thumbnails:{name}'
+
+
+def generate(name):
+    """Создать все миниатюры картинки и запомнить их адреса."""
+    if not default_storage.exists(name):
+        return {}
+    urls = {
+        alias: get_thumbnail(name, geometry, **options).url
+        for alias, (geometry, options) in settings.POST_THUMBNAILS.items()
+    }
+    cache.set(urls_key(name), urls, None)
+    return urls
+
+
+def generate_in_background(name):
+    try:
+        return generate(name)
+    except Exception:
+        logger.warning(
+            'Не удалось создать миниатюры для %s', name, exc_info=True
+        )
+        return {}
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global executor
+    with _executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return executor
+
+
+def generate_many(names):
+    """Создать миниатюры для нескольких картинок в пуле потоков."""
+    if not settings.THUMBNAIL_WORKERS:
+        return map(generate_in_background, names)
+    return get_executor().map(generate_in_background, names)
+
+
+def schedule(name):
+    """Поставить картинку в очередь после фиксации транзакции."""
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: generate_in_background(name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_in_background, name)
+    )
+
+
+def url(name, alias):
+    """Адрес миниатюры; создаётся на месте, если её ещё нет."""
+    urls = cache.get(urls_key(name))
+    if urls is None:
+        try:
+            urls = generate(name)
+        except Exception:
+            logger.warning('Нет миниатюр для %s', name, exc_info=True)
+            urls = {}
+    return urls.get(alias, '')
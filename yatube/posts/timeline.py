@@ -0,0 +1,300 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост раскладывается по записям `TimelineEntry` всех
+подписчиков автора, поэтому страница `/follow/` читает готовую ленту
+по индексу `(user, post)`, а не соединяет `Follow` и `Post`.
+
+Посты «звёздных» авторов (`AuthorStats.celebrity`) не раскладываются,
+а подмешиваются в ленту при чтении. Автор становится «звездой», когда
+подписчиков набирается `TIMELINE_CELEBRITY_FOLLOWERS`, а перестаёт,
+когда их меньше `TIMELINE_CELEBRITY_FOLLOWERS_MIN`: между порогами
+признак не меняется, и автор у границы не раскладывается заново на
+каждой подписке и отписке.
+
+Снять признак — значит разложить все посты автора по лентам
+подписчиков, иначе они пропали бы из `/follow/`. Это делается после
+фиксации в фоне (`TIMELINE_WORKERS`) пачками по
+`TIMELINE_BACKFILL_BATCH` записей, каждая своей транзакцией записи;
+пока идёт раскладка, посты автора по-прежнему читаются при запросе.
+Если процесс не успел, признак снимет команда `backfill_timeline`.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from yatube import db
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global executor
+    with _executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.TIMELINE_WORKERS,
+                thread_name_prefix='timeline',
+            )
+        return executor
+
+
+def is_celebrity(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id, celebrity=True
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, которых читаем при запросе."""
+    return Follow.objects.filter(
+        user=user, author__stats__celebrity=True
+    ).values('author')
+
+
+def fan_out_post(post):
+    """Добавить пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(posts):
+    """Разложить пачку постов по лентам подписчиков их авторов."""
+    dates = {post.pk: (post.author_id, post.pub_date) for post in posts}
+    authors = {author_id for author_id, _ in dates.values()}
+    followers = Follow.objects.filter(author_id__in=authors).exclude(
+        author__stats__celebrity=True
+    ).values_list('author_id', 'user_id')
+    readers = {}
+    for author_id, user_id in followers.iterator():
+        readers.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, (author_id, pub_date) in dates.items()
+            for user_id in readers.get(author_id, ())
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Заполнить ленту постами автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=pk,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for pk, pub_date in posts.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def fill(author_id, user_ids, posts):
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=pk,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id in user_ids
+            for pk, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def follower_added(author_id):
+    """После подписки: сделать автора «звездой», если пора."""
+    AuthorStats.objects.filter(
+        user_id=author_id,
+        celebrity=False,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+    ).update(celebrity=True)
+
+
+def follower_removed(author_id):
+    """После отписки: снять с автора признак «звезды», если пора."""
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        celebrity=True,
+        followers_count__lt=settings.TIMELINE_CELEBRITY_FOLLOWERS_MIN,
+    ).exists():
+        transaction.on_commit(lambda: schedule_demotion(author_id))
+
+
+def schedule_demotion(author_id):
+    # Пока раскладка идёт, новые отписки не ставят её ещё раз.
+    if not cache.add(f'timeline_demotion:{author_id}', 1, 60 * 60):
+        return
+    if not settings.TIMELINE_WORKERS:
+        demote_in_background(author_id)
+        return
+    get_executor().submit(demote_in_background, author_id)
+
+
+def demote_in_background(author_id):
+    try:
+        demote(author_id)
+    except Exception:
+        logger.warning(
+            'Не удалось разложить посты автора %s', author_id,
+            exc_info=True,
+        )
+    finally:
+        cache.delete(f'timeline_demotion:{author_id}')
+        close_old_connections()
+
+
+def demote(author_id):
+    """Разложить посты «звезды» по лентам подписчиков и снять признак.
+
+    Подписчики обходятся пачками по id подписки. Подписки и посты,
+    появившиеся за время обхода, дораскладываются в той же транзакции,
+    что снимает признак: пока она идёт, других записей нет.
+    """
+    posts = Post.objects.filter(author_id=author_id).order_by().values_list(
+        'pk', 'pub_date'
+    )
+    known = list(posts)
+    last_post = max((pk for pk, _ in known), default=0)
+    follows = Follow.objects.filter(author_id=author_id).order_by('pk')
+    size = max(1, settings.TIMELINE_BACKFILL_BATCH // max(1, len(known)))
+    last_follow = 0
+    while True:
+        batch = list(follows.filter(pk__gt=last_follow).values_list(
+            'pk', 'user_id'
+        )[:size])
+        if not batch:
+            break
+        with db.write():
+            # Удалённые за это время посты уже не раскладываем.
+            present = set(posts.filter(
+                pk__lte=last_post
+            ).values_list('pk', flat=True))
+            known = [post for post in known if post[0] in present]
+            fill(author_id, [user_id for _, user_id in batch], known)
+        last_follow = batch[-1][0]
+    with db.write():
+        demoted = AuthorStats.objects.filter(
+            user_id=author_id,
+            celebrity=True,
+            followers_count__lt=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+        ).update(celebrity=False)
+        if not demoted:
+            return
+        fill(
+            author_id,
+            follows.filter(pk__lte=last_follow).values_list(
+                'user_id', flat=True
+            ),
+            list(posts.filter(pk__gt=last_post)),
+        )
+        fill(
+            author_id,
+            follows.filter(pk__gt=last_follow).values_list(
+                'user_id', flat=True
+            ),
+            list(posts),
+        )
+
+
+def demote_pending():
+    """Снять признак со всех «звёзд», у которых стало мало подписчиков."""
+    authors = list(AuthorStats.objects.filter(
+        celebrity=True,
+        followers_count__lt=settings.TIMELINE_CELEBRITY_FOLLOWERS_MIN,
+    ).values_list('user_id', flat=True))
+    for author_id in authors:
+        demote(author_id)
+    return len(authors)
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user):
+    """Пересобрать ленту пользователя по текущим подпискам."""
+    TimelineEntry.objects.filter(user=user).delete()
+    for author_id in Follow.objects.filter(
+        user=user
+    ).values_list('author_id', flat=True):
+        add_author(user.pk, author_id)
+
+
+def timeline_posts(user):
+    """Посты ленты подписок: материализованные и «звёздные»."""
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=celebrity_ids(user))
+    )
+
+
+def load_posts(entries):
+    posts = Post.objects.for_feed().in_bulk(
+        [entry.post_id for entry in entries]
+    )
+    # Пост мог быть удалён после выборки страницы записей.
+    return [
+        posts[entry.post_id] for entry in entries if entry.post_id in posts
+    ]
+
+
+def feed(user):
+    """Аргументы пагинатора для страницы подписок.
+
+    Без «звёздных» авторов страница выбирается из записей ленты по
+    индексу `(user, pub_date, post)` без сортировки, а посты затем
+    загружаются по первичному ключу. Иначе материализованные посты
+    объединяются с постами «звёзд» одним запросом.
+    """
+    if celebrity_ids(user).exists():
+        return {'post_list': timeline_posts(user).for_feed()}
+    return {
+        'post_list': TimelineEntry.objects.filter(user=user).only(
+            'pub_date', 'post'
+        ),
+        'keys': ('pub_date', 'post_id'),
+        'load': load_posts,
+    }
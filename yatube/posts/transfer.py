@@ -0,0 +1,285 @@
+"""Потоковые выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Выгрузка читает таблицу итератором по первичному ключу и пишет строки
+по одной, поэтому память не растёт с размером таблицы. Загрузка
+собирает строки в пачки и сохраняет каждую через `bulk_create` в
+отдельной транзакции. Пользователи и группы указываются по `username`
+и `slug` и переводятся в id по словарям, загруженным один раз. Посты
+и комментарии сохраняют свои id, чтобы комментарии ссылались на
+загруженные посты.
+
+`bulk_create` не вызывает сигналы, поэтому производные данные (ленты
+подписок, поисковый индекс, счётчики, версии кэша) обновляются здесь
+же: ленты и индекс — в транзакции каждой пачки, счётчики и кэш — после
+загрузки.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from io import StringIO
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from yatube import db
+
+from . import feed_cache, graph, hot, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 500
+FORMATS = ('ndjson', 'csv')
+
+# Колонки выгрузки и пути к ним в `values_list`.
+COLUMNS = {
+    'groups': (Group, (
+        ('slug', 'slug'),
+        ('title', 'title'),
+        ('description', 'description'),
+    )),
+    'posts': (Post, (
+        ('id', 'pk'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('pub_date', 'pub_date'),
+        ('text', 'text'),
+        ('image', 'image'),
+    )),
+    'comments': (Comment, (
+        ('id', 'pk'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('created', 'created'),
+        ('active', 'active'),
+        ('text', 'text'),
+    )),
+    'follows': (Follow, (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+@contextmanager
+def auto_now_add_disabled(*fields):
+    """Позволить `bulk_create` сохранить заданные даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, batch_size=BATCH_SIZE):
+    """Строки таблицы словарями, без загрузки всей таблицы в память."""
+    model, columns = COLUMNS[kind]
+    names = [name for name, _ in columns]
+    rows = model.objects.order_by('pk').values_list(
+        *(lookup for _, lookup in columns)
+    ).iterator(chunk_size=batch_size)
+    for row in rows:
+        yield dict(zip(names, map(serialize, row)))
+
+
+def write(rows, stream, format, kind):
+    """Записать строки в `stream` и вернуть их число."""
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(
+            stream, [name for name, _ in COLUMNS[kind][1]]
+        )
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def read(stream, format):
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise TransferError(f'Строка {number}: {error}')
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Importer:
+    """Загрузка строк одного вида пачками.
+
+    Отсутствующих пользователей создаёт с неиспользуемым паролем, если
+    задан `create_users`, иначе прерывает загрузку.
+    """
+
+    def __init__(self, kind, batch_size=BATCH_SIZE, create_users=False,
+                 ignore_conflicts=False):
+        self.kind = kind
+        self.model = COLUMNS[kind][0]
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.ignore_conflicts = ignore_conflicts
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.now = timezone.now()
+        self.scopes = {'index'}
+        # Группы, чьи буферы последних постов (posts.hot) устарели.
+        self.hot_groups = set()
+
+    def user_id(self, username):
+        if username not in self.users:
+            raise TransferError(f'Нет пользователя {username!r}')
+        return self.users[username]
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise TransferError(f'Нет группы {slug!r}')
+        return self.groups[slug]
+
+    def moment(self, value):
+        return parse_datetime(value) if value else self.now
+
+    def add_users(self, chunk):
+        names = {
+            row[key] for row in chunk for key in ('author', 'user')
+            if row.get(key) and row[key] not in self.users
+        }
+        if not names or not self.create_users:
+            return
+        User.objects.bulk_create(
+            User(username=name, password='!') for name in sorted(names)
+        )
+        self.users.update(
+            User.objects.filter(username__in=names).values_list(
+                'username', 'pk'
+            )
+        )
+
+    def build_groups(self, row):
+        return Group(
+            slug=row['slug'], title=row['title'],
+            description=row.get('description') or '',
+        )
+
+    def build_posts(self, row):
+        return Post(
+            pk=int(row['id']),
+            author_id=self.user_id(row['author']),
+            group_id=self.group_id(row.get('group')),
+            pub_date=self.moment(row.get('pub_date')),
+            text=row['text'],
+            image=row.get('image') or '',
+        )
+
+    def build_comments(self, row):
+        return Comment(
+            pk=int(row['id']),
+            post_id=int(row['post']),
+            author_id=self.user_id(row['author']),
+            created=self.moment(row.get('created')),
+            active=row.get('active') in (True, 'True', 'true', '1'),
+            text=row['text'],
+        )
+
+    def build_follows(self, row):
+        return Follow(
+            user_id=self.user_id(row['user']),
+            author_id=self.user_id(row['author']),
+        )
+
+    def after_posts(self, objects):
+        posts = list(Post.objects.filter(
+            pk__in=[post.pk for post in objects]
+        ).only('author', 'group', 'pub_date', 'text'))
+        timeline.fan_out_posts(posts)
+        backend = search.get_backend()
+        for post in posts:
+            backend.index(post.pk, post.text)
+            self.scopes.update(feed_cache.post_scopes(post))
+            if post.group_id:
+                self.hot_groups.add(post.group_id)
+
+    def after_comments(self, objects):
+        for pk, author_id, group_id in Post.objects.filter(
+            pk__in={comment.post_id for comment in objects}
+        ).values_list('pk', 'author_id', 'group_id'):
+            self.scopes.update(feed_cache.post_scopes(
+                Post(pk=pk, author_id=author_id, group_id=group_id)
+            ))
+            if group_id:
+                self.hot_groups.add(group_id)
+
+    def after_follows(self, objects):
+        for follow in objects:
+            timeline.add_author(follow.user_id, follow.author_id)
+            graph.changed(follow)
+            self.scopes.add(f'follow:{follow.user_id}')
+
+    def save(self, chunk):
+        self.add_users(chunk)
+        build = getattr(self, f'build_{self.kind}')
+        objects = [build(row) for row in chunk]
+        with db.write():
+            self.model.objects.bulk_create(
+                objects, ignore_conflicts=self.ignore_conflicts
+            )
+            after = getattr(self, f'after_{self.kind}', None)
+            if after:
+                after(objects)
+
+    def load(self, rows):
+        """Загрузить строки и вернуть их число."""
+        count = 0
+        fields = [
+            field for field in self.model._meta.fields
+            if getattr(field, 'auto_now_add', False)
+        ]
+        with auto_now_add_disabled(*fields):
+            for chunk in chunked(rows, self.batch_size):
+                self.save(chunk)
+                count += len(chunk)
+        self.finish()
+        return count
+
+    def finish(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [self.model]
+            ):
+                cursor.execute(sql)
+        if self.kind != 'groups':
+            call_command('recount_stats', stdout=StringIO())
+        feed_cache.bump(*self.scopes)
+        hot.forget(*self.hot_groups)
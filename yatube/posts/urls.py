@@ -1,14 +1,32 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("rss/", feeds.index_rss, name="index_rss"),
+    path("atom/", feeds.index_atom, name="index_atom"),
+    path("search/", views.post_search, name="search"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path("group/<slug:slug>/rss/", feeds.group_rss, name="group_rss"),
+    path("group/<slug:slug>/atom/", feeds.group_atom, name="group_atom"),
     path("profile/<str:username>/", views.profile, name="profile"),
+    path(
+        "profile/<str:username>/rss/", feeds.author_rss, name="author_rss"
+    ),
+    path(
+        "profile/<str:username>/atom/",
+        feeds.author_atom,
+        name="author_atom"
+    ),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.comment_list,
+        name="comment_list"
+    ),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
@@ -1,72 +1,203 @@
 from django.conf import settings
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 
-from . models import Follow, Group, Post, User
+from core import parallel
+from yatube import db
+
+from . import feed_cache, follows, hot, search, stats, timeline
+from . models import Comment, Follow, Group, Post, User
 from .forms import CommentForm, PostForm
+from .paginators import BufferPaginator, CursorPaginator
+
+
+def page_paginator(request, post_list, paginator=CursorPaginator, **options):
+    return paginator(
+        post_list, settings.MAX_PAGE_COUNT, **options
+    ).get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def comment_page(request, post_id):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).only('text', 'created', 'author__username'),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'pk'),
+        descending=False,
+    ).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def load_posts(post_ids):
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return [posts[pk] for pk in post_ids if pk in posts]
+
+
+def load_rows(rows):
+    return load_posts([row['pk'] for row in rows])
+
+
+def index_scopes(request):
+    return ['index'], ()
+
+
+def group_scopes(request, slug):
+    group_id = get_object_or_404(
+        Group.objects.values_list('pk', flat=True), slug=slug
+    )
+    return [f'group:{group_id}'], ()
+
+
+def profile_scopes(request, username):
+    # Число постов меняется вместе с лентой автора, остальные
+    # счётчики — нет, поэтому они входят в ETag значениями.
+    author_id, *counters = get_object_or_404(
+        User.objects.values_list(
+            'pk', 'stats__followers_count', 'stats__following_count',
+            'stats__comments_count',
+        ),
+        username=username,
+    )
+    scopes = [f'author:{author_id}']
+    if request.user.is_authenticated:
+        scopes.append(f'follow:{request.user.pk}')
+    return scopes, counters
 
 
-def page_paginator(request, post_list):
-    return Paginator(post_list, settings.MAX_PAGE_COUNT).get_page(
-        request.GET.get('page')
+def post_scopes(request, post_id):
+    author_id = get_object_or_404(
+        Post.objects.values_list('author_id', flat=True), pk=post_id
     )
+    return [f'post:{post_id}', f'author:{author_id}'], ()
+
+
+def comment_scopes(request, post_id):
+    get_object_or_404(Post.objects.values('pk'), pk=post_id)
+    return [f'post:{post_id}'], ()
+
 
+def follow_scopes(request):
+    return feed_cache.follow_scopes(request.user), ()
 
+
+@feed_cache.conditional(index_scopes)
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': page_paginator(request, Post.objects.all()),
+        'page_obj': page_paginator(request, Post.objects.for_feed()),
+        **feed_cache.context(request, 'index'),
     })
 
 
+@feed_cache.conditional(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
+    trending = request.GET.get('order') == 'trending'
+    if trending:
+        page_obj = page_paginator(
+            request, hot.trending(group.pk), keys=None, load=load_posts
+        )
+    else:
+        page_obj = page_paginator(
+            request,
+            group.posts.values('pub_date', 'pk'),
+            paginator=BufferPaginator,
+            load=load_rows,
+            **hot.latest(group.pk),
+        )
     return render(request, 'posts/group_list.html', {
         'group': group,
-        "page_obj": page_paginator(request, group.posts.all()),
+        'trending': trending,
+        "page_obj": page_obj,
+        **feed_cache.context(request, f'group:{group.pk}'),
     })
 
 
+@feed_cache.conditional(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     # try:
     #     following = Follow.objects.get(user=request.user, author=author)
     # except Exception:
     #     following = False
-    following = (
-        request.user.is_authenticated
-        and request.user != author
-        and Follow.objects.filter(
-            author=author, user=request.user
-        ).exists()
-    )
+    user = request.user
+    posts = author.posts.for_feed()
+    if user.is_authenticated and user != author:
+        page_obj, following = parallel.gather(
+            lambda: page_paginator(request, posts),
+            lambda: follows.is_following(user, author),
+        )
+    else:
+        page_obj, following = page_paginator(request, posts), False
     return render(request, 'posts/profile.html', {
-        'page_obj': page_paginator(request, author.posts.all()),
+        'page_obj': page_obj,
         'author': author,
+        'author_stats': stats.for_user(author),
         'following': following,
+        **feed_cache.context(request, f'author:{author.pk}'),
     })
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_paginator(
+            request,
+            search.search(query) if query else [],
+            keys=None,
+            load=load_posts,
+        ),
+    })
+
+
+@feed_cache.conditional(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post, comments = parallel.gather(
+        lambda: get_object_or_404(
+            Post.objects.with_related().select_related('author__stats'),
+            pk=post_id
+        ),
+        lambda: comment_page(request, post_id),
+    )
     form = CommentForm(request.POST or None)
     return render(request, 'posts/post_detail.html', {
-        'count_of_posts': post.author.posts.all().count(),
+        'count_of_posts': stats.for_user(post.author).posts_count,
         'post': post,
         'form': form,
-        'comments': post.comments.all(),
+        'comments': comments,
+    })
+
+
+@feed_cache.conditional(comment_scopes)
+def comment_list(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    return render(request, 'includes/comments.html', {
+        'post_id': post_id,
+        'comments': comment_page(request, post_id),
     })
 
 
 @login_required
 def post_create(request):
+    # Проверка формы пережимает картинку, поэтому идёт до блокировки
+    # записи.
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
-    post = form.save(commit=False)
-    post.author = request.user
-    post.save()
+    with db.write():
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
     return redirect(
         'posts:profile',
         username=request.user.username
@@ -82,7 +213,8 @@ def post_edit(request, post_id):
                     files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        with db.write():
+            form.save()
         return redirect('posts:post_detail', post_id=post.pk)
     return render(request, 'posts/create_post.html', {
         'form': form,
@@ -92,6 +224,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@db.write()
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -104,14 +237,18 @@ def add_comment(request, post_id):
 
 
 @login_required
+@feed_cache.conditional(follow_scopes)
 def follow_index(request):
-    follow_post = Post.objects.filter(author__following__user=request.user)
     return render(request, 'posts/follow.html', {
-        'page_obj': page_paginator(request, follow_post),
+        'page_obj': page_paginator(request, **timeline.feed(request.user)),
+        **feed_cache.context(
+            request, *feed_cache.follow_scopes(request.user)
+        ),
     })
 
 
 @login_required
+@db.write()
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -120,6 +257,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@db.write()
 def profile_unfollow(request, username):
     get_object_or_404(
         Follow,
@@ -0,0 +1,22 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 не умеет ASGI сам, поэтому приложение — обёртка над
+WSGI-обработчиком из ``yatube.wsgi`` (см. core/asgi.py). Пул соединений
+прогревается при старте (``lifespan``), уже в рабочем процессе. Запуск:
+
+    uvicorn yatube.asgi:application
+"""
+
+from django.conf import settings
+
+from core import pool
+from core.asgi import ASGIHandler
+
+from .wsgi import application as wsgi_application
+
+application = ASGIHandler(
+    wsgi_application, settings.ASGI_THREADS, startup=pool.warm_up
+)
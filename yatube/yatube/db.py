@@ -0,0 +1,87 @@
+"""Настройка SQLite для одновременных чтений и записей.
+
+При открытии соединения выполняются прагмы из `SQLITE_PRAGMAS`: журнал
+WAL, чтобы читатели не ждали писателя, `synchronous=NORMAL`,
+отображение файла в память, размер кэша страниц и `busy_timeout`.
+
+Транзакция SQLite, которая начинается чтением, а потом пишет, не может
+дождаться чужой записи: при повышении блокировки база сразу отвечает
+«database is locked». Поэтому записи идут через `write`: внешняя
+транзакция открывается `BEGIN IMMEDIATE` и сразу берёт блокировку
+записи (ожидая её не дольше `busy_timeout`), а потоки одного процесса
+встают в очередь на обычной блокировке и не крутятся в ожидании
+SQLite.
+"""
+import threading
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+from django.db.backends.signals import connection_created
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def lock(using):
+    with _locks_guard:
+        return _locks.setdefault(using, threading.RLock())
+
+
+def start_transaction(connection):
+    """Начать транзакцию; для `write` — сразу с блокировкой записи."""
+    if getattr(connection, 'begin_immediate', False):
+        connection.cursor().execute('BEGIN IMMEDIATE')
+    else:
+        connection.cursor().execute('BEGIN')
+
+
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Соединению из пула (core.pool) прагмы уже выставлены.
+    if not getattr(connection, 'reused_connection', False):
+        with connection.cursor() as cursor:
+            for name, value in settings.SQLITE_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+    connection._start_transaction_under_autocommit = (
+        lambda: start_transaction(connection)
+    )
+
+
+def install():
+    connection_created.connect(configure, dispatch_uid='yatube.db')
+
+
+class write(ContextDecorator):
+    """Транзакция записи: `transaction.atomic` под блокировкой записи.
+
+    Вложенные блоки работают как обычные точки сохранения.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def __enter__(self):
+        timeout = settings.SQLITE_PRAGMAS.get('busy_timeout', 0) / 1000
+        if not lock(self.using).acquire(timeout=timeout or -1):
+            raise OperationalError('database is locked')
+        connection = connections[self.using]
+        block = transaction.atomic(using=self.using)
+        connection.begin_immediate = True
+        try:
+            block.__enter__()
+        except Exception:
+            lock(self.using).release()
+            raise
+        finally:
+            connection.begin_immediate = False
+        connection.__dict__.setdefault('write_blocks', []).append(block)
+
+    def __exit__(self, *exc_info):
+        connection = connections[self.using]
+        try:
+            return connection.write_blocks.pop().__exit__(*exc_info)
+        finally:
+            lock(self.using).release()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,18 +46,32 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Без DEBUG шаблоны компилируются один раз: кэширующий загрузчик
+# заполняется при старте (см. yatube/wsgi.py).
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Время отрисовки каждого шаблона и тега миниатюры для /metrics/.
+TEMPLATE_PROFILING = os.environ.get('TEMPLATE_PROFILING') == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.templates.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -76,10 +91,71 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Копии основной базы только для чтения: DATABASE_REPLICAS=путь1,путь2.
+# В тестах реплики совпадают с основной базой.
+for number, path in enumerate(filter(None, os.environ.get(
+    'DATABASE_REPLICAS', ''
+).split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+# Прагмы каждого нового соединения SQLite (см. yatube/db.py):
+# cache_size в КиБ со знаком минус, busy_timeout в миллисекундах.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+# Пул соединений на процесс (см. core/pool.py). CONN_MAX_AGE остаётся
+# нулевым: в конце запроса соединение возвращается в пул. SIZE не меньше
+# ASGI_THREADS + VIEW_THREADS, чтобы потоки запросов не ждали соединения.
+DATABASE_POOL = {
+    'SIZE': 8,
+    'MIN': 2,
+    'TIMEOUT': 10,
+    'MAX_AGE': 60 * 30,
+    'HEALTH_CHECK_IDLE': 30,
+}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Потоки, в которых ASGI-приложение (yatube/asgi.py) выполняет запросы,
+# и потоки для независимых частей одного запроса (core/parallel.py).
+ASGI_THREADS = 6
+VIEW_THREADS = 2
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Представления, которые при GET читают из реплик.
+REPLICA_READ_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:comment_list',
+    'posts:follow_index',
+    'posts:index_rss',
+    'posts:index_atom',
+    'posts:group_rss',
+    'posts:group_atom',
+    'posts:author_rss',
+    'posts:author_atom',
+    'api:posts',
+    'api:post_batch',
+    'api:post',
+    'api:comments',
+    'api:groups',
+    'api:group_batch',
+    'api:group',
+]
+# Наибольшее допустимое отставание реплик в секундах. Столько же после
+# записи пользователь читает из основной базы (по cookie).
+REPLICA_LAG_TOLERANCE = 5
+REPLICA_STICKY_COOKIE = 'primary_reads'
 
 
 # Password validation
@@ -129,6 +205,35 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MAX_PAGE_COUNT = 10
+COMMENTS_PER_PAGE = 20
+# Число постов в лентах RSS и Atom.
+FEED_ITEMS = 20
+# Сколько последних постов группы держать в кэше, на сколько секунд
+# и за сколько секунд комментарий теряет половину веса в «обсуждаемых».
+GROUP_HOT_POSTS = 200
+GROUP_HOT_TIMEOUT = 60 * 60
+GROUP_TRENDING_HALF_LIFE = 60 * 60 * 6
+# Размер страницы JSON API по умолчанию и наибольший (?limit=), а
+# также наибольшее число объектов в пакетном запросе.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_BATCH_SIZE = 100
+
+# Поиск по постам: 'posts.search.SQLiteFTSBackend' (FTS5) или
+# 'posts.search.PythonIndexBackend' (индекс в файле SEARCH_INDEX_PATH).
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+SEARCH_INDEX_PATH = os.path.join(BASE_DIR, 'search_index')
+SEARCH_MAX_RESULTS = 1000
+
+# Авторы, набравшие столько подписчиков, не раскладываются по лентам
+# подписок при публикации, а подмешиваются в ленту при чтении, пока
+# подписчиков не станет меньше MIN. Тогда их посты раскладываются в
+# фоне (при TIMELINE_WORKERS = 0 — сразу после фиксации) пачками по
+# BATCH записей.
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+TIMELINE_CELEBRITY_FOLLOWERS_MIN = 9000
+TIMELINE_WORKERS = 1
+TIMELINE_BACKFILL_BATCH = 10000
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -138,8 +243,73 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки больше этого размера пишутся во временный файл на диске.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Ограничения и параметры пережатия картинок постов.
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 85
+# WebP используется, только если его поддерживает установленный Pillow.
+POST_IMAGE_WEBP = os.getenv('POST_IMAGE_WEBP') == '1'
+
+# Размеры миниатюр картинок постов, которые готовятся в фоне.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# При 0 миниатюры готовятся сразу после фиксации транзакции.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_BACKEND = 'core.backends.thumbnails.ThumbnailBackend'
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.cache.LocMemCache',
     }
 }
+# С REDIS_URL=redis://хост:порт/база кэш становится общим для всех
+# процессов: локальный LRU на LOCAL_TIMEOUT секунд поверх Redis.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'core.backends.tiered.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'LOCAL_TIMEOUT': 2,
+            'SHARED': {
+                'BACKEND': 'core.backends.redis.RedisCache',
+                'LOCATION': REDIS_URL,
+                'OPTIONS': {'SOCKET_TIMEOUT': 1},
+            },
+        },
+    }
+
+# Общий ли кэш у всех процессов. Версию ленты в кэше процесса сигнал
+# меняет только в том процессе, где прошла запись, поэтому без Redis
+# версии лент и фрагменты живут не дольше FEED_VERSION_TIMEOUT секунд.
+CACHE_SHARED = bool(REDIS_URL)
+FEED_VERSION_TIMEOUT = None if CACHE_SHARED else 30
+# С общим кэшем фрагменты лент сбрасываются сигналами при изменении
+# постов, поэтому срок жизни может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6 if CACHE_SHARED else FEED_VERSION_TIMEOUT
+# Буфер постов группы (posts/hot.py) в кэше процесса тоже меняется
+# только там, где прошла запись.
+if not CACHE_SHARED:
+    GROUP_HOT_TIMEOUT = FEED_VERSION_TIMEOUT
+# Списки подписок и подписчиков в кэше (posts/graph.py); подписка
+# меняет их версию после фиксации. Подсказки «кого читать» собираются
+# по подпискам не больше чем SOURCES авторов.
+GRAPH_TIMEOUT = 60 * 10
+GRAPH_SUGGESTION_SOURCES = 100
+
+# Границы корзин гистограмм времени (в секундах) для /metrics/.
+METRICS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# Токен для страницы /metrics/: с ним страница отдаётся только по
+# заголовку `Authorization: Bearer <токен>`. Без токена доступ решается
+# по METRICS_ALLOWED_IPS (пустой список — всем), но за обратным прокси
+# REMOTE_ADDR — адрес самого прокси, поэтому там нужен токен или прокси
+# должен закрывать /metrics/ снаружи.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
@@ -5,6 +5,15 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
+
+Пул соединений (core.pool) здесь не прогревается: модуль загружается до
+fork, и рабочие процессы унаследовали бы соединения SQLite родителя.
+Сервер с рабочими процессами прогревает пул в каждом из них, например
+в gunicorn.conf.py:
+
+    def post_fork(server, worker):
+        from core import pool
+        pool.warm_up()
 """
 
 import os
@@ -14,3 +23,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from core.backends.templates import warm_up  # noqa: E402
+
+warm_up()